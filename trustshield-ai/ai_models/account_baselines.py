@@ -0,0 +1,205 @@
+"""
+Per-account behavioural baselines for transaction anomaly detection.
+
+Each account keeps rolling statistics of its own transactions: a histogram
+of log amounts (for quantiles), the mean and variance of the reported
+frequency, and the share of international transfers. New transactions are
+scored against that history instead of one global distribution, so an
+account that routinely moves $50k is not flagged for doing so again.
+
+State lives in preallocated NumPy arrays (one row per account slot), so
+memory is fixed by `capacity`. When the store is full the least recently
+used account is evicted; accounts with too little history are scored by the
+global model instead.
+
+    TRUSTSHIELD_BASELINE_CAPACITY   accounts kept in memory (default: 100000)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+DEFAULT_CAPACITY = int(os.environ.get("TRUSTSHIELD_BASELINE_CAPACITY", "100000"))
+
+AMOUNT_BINS = 32
+MAX_LOG_AMOUNT = 8.0    # histogram covers $0 - $100M on a log10 scale
+
+
+def amount_bin(amount) -> np.ndarray:
+    """Histogram bin of an amount (or array of amounts)."""
+    scaled = np.log10(1.0 + np.maximum(amount, 0.0)) / MAX_LOG_AMOUNT * AMOUNT_BINS
+    return np.clip(scaled.astype(np.int64), 0, AMOUNT_BINS - 1)
+
+
+def bin_upper_amount(index) -> np.ndarray:
+    """Largest amount that falls in a bin."""
+    return 10.0 ** ((np.asarray(index) + 1) * MAX_LOG_AMOUNT / AMOUNT_BINS) - 1.0
+
+
+class AccountBaselineStore:
+    """
+    Fixed-memory store of per-account transaction baselines.
+
+    Args:
+        capacity: Maximum number of accounts kept; the least recently used is evicted
+        min_history: Transactions needed before an account's own baseline is used
+        max_history: Histogram weight at which old history is halved, so the
+            baseline follows recent behaviour
+        amount_quantile: Amounts above this quantile of the account's history
+            are unusual
+        frequency_z: Standard deviations above the account's mean frequency
+            that count as unusual
+        international_ratio: International transfers are unusual for accounts
+            below this share
+    """
+
+    def __init__(self,
+                 capacity: int = DEFAULT_CAPACITY,
+                 min_history: int = 5,
+                 max_history: int = 1000,
+                 amount_quantile: float = 0.99,
+                 frequency_z: float = 3.0,
+                 international_ratio: float = 0.05):
+        self.capacity = capacity
+        self.min_history = min_history
+        self.max_history = max_history
+        self.amount_quantile = amount_quantile
+        self.frequency_z = frequency_z
+        self.international_ratio = international_ratio
+
+        # Struct of arrays, one row per slot
+        self.histogram = np.zeros((capacity, AMOUNT_BINS), dtype=np.uint16)
+        self.weight = np.zeros(capacity, dtype=np.float32)
+        self.international = np.zeros(capacity, dtype=np.float32)
+        self.frequency_mean = np.zeros(capacity, dtype=np.float32)
+        self.frequency_var = np.zeros(capacity, dtype=np.float32)
+        self.last_seen = np.zeros(capacity, dtype=np.float64)
+
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free = list(range(capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _slot(self, account_id: str, create: bool) -> Optional[int]:
+        slot = self._slots.get(account_id)
+        if slot is not None:
+            self._slots.move_to_end(account_id)
+            return slot
+        if not create:
+            return None
+
+        if self._free:
+            slot = self._free.pop()
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self.evictions += 1
+        self.histogram[slot] = 0
+        self.weight[slot] = 0
+        self.international[slot] = 0
+        self.frequency_mean[slot] = 0
+        self.frequency_var[slot] = 0
+        self._slots[account_id] = slot
+        return slot
+
+    def update(self, account_id: str, amount: float, frequency: float,
+               is_international: int, timestamp: Optional[float] = None) -> None:
+        """Add one transaction to the account's history."""
+        with self._lock:
+            slot = self._slot(account_id, create=True)
+
+            if self.weight[slot] >= self.max_history:
+                self.histogram[slot] //= 2
+                self.weight[slot] = self.histogram[slot].sum()
+                self.international[slot] /= 2
+
+            self.histogram[slot, amount_bin(amount)] += 1
+            self.weight[slot] += 1
+            self.international[slot] += 1 if is_international else 0
+
+            # Welford update; the effective window shrinks when history is halved
+            n = self.weight[slot]
+            delta = frequency - self.frequency_mean[slot]
+            self.frequency_mean[slot] += delta / n
+            self.frequency_var[slot] += (delta * (frequency - self.frequency_mean[slot]) - self.frequency_var[slot]) / n
+
+            self.last_seen[slot] = time.time() if timestamp is None else timestamp
+
+    def quantile(self, account_id: str, q: float) -> Optional[float]:
+        """Approximate amount quantile (upper edge of the bin holding it)."""
+        with self._lock:
+            slot = self._slot(account_id, create=False)
+            if slot is None or self.weight[slot] == 0:
+                return None
+            return float(self._quantile(slot, q))
+
+    def _quantile(self, slot: int, q: float) -> float:
+        counts = self.histogram[slot]
+        cdf = np.cumsum(counts) / counts.sum()
+        return bin_upper_amount(int(np.searchsorted(cdf, q)))
+
+    def score(self, account_id: str, amount: float, frequency: float,
+              is_international: int) -> Optional[Dict]:
+        """
+        Score a transaction against the account's own history.
+
+        Returns:
+            Flag, reasons and baseline statistics, or None if the account has
+            too little history (use the global model instead)
+        """
+        with self._lock:
+            slot = self._slot(account_id, create=False)
+            if slot is None or self.weight[slot] < self.min_history:
+                return None
+
+            counts = self.histogram[slot].astype(np.float64)
+            total = counts.sum()
+            index = int(amount_bin(amount))
+            # Share of past transactions below this amount, counting its own bin half
+            percentile = (counts[:index].sum() + counts[index] / 2) / total
+
+            amount_limit = self._quantile(slot, self.amount_quantile)
+            amount_median = self._quantile(slot, 0.5)
+            frequency_mean = float(self.frequency_mean[slot])
+            frequency_std = float(np.sqrt(max(self.frequency_var[slot], 0.0)))
+            international_ratio = float(self.international[slot] / self.weight[slot])
+            history = int(self.weight[slot])
+
+        reasons = []
+        if amount > amount_limit:
+            reasons.append(
+                f"Amount ${amount:,.2f} is above this account's usual maximum (${amount_limit:,.2f})"
+            )
+        if frequency > frequency_mean + self.frequency_z * max(frequency_std, 1.0):
+            reasons.append(
+                f"Frequency {frequency:g} is unusual for this account (typically {frequency_mean:.1f})"
+            )
+        if is_international and international_ratio < self.international_ratio:
+            reasons.append("International transfer from an account that rarely sends abroad")
+
+        return {
+            "anomaly_flag": -1 if reasons else 1,
+            "reasons": reasons,
+            "amount_percentile": round(float(percentile), 4),
+            "amount_median": round(float(amount_median), 2),
+            "amount_limit": round(float(amount_limit), 2),
+            "typical_frequency": round(frequency_mean, 2),
+            "international_ratio": round(international_ratio, 4),
+            "history": history
+        }
+
+    def stats(self) -> Dict:
+        arrays = (self.histogram, self.weight, self.international,
+                  self.frequency_mean, self.frequency_var, self.last_seen)
+        return {
+            "accounts": len(self._slots),
+            "capacity": self.capacity,
+            "evictions": self.evictions,
+            "array_memory_mb": round(sum(a.nbytes for a in arrays) / (1024 * 1024), 1)
+        }
+
+
+# Global instance
+baselines = AccountBaselineStore()
@@ -0,0 +1,141 @@
+"""
+Pipeline stages used by CallAnalyzer.
+
+Each model-backed step has a primary stage and a fallback stage with the same
+interface. The analyzer binds one of them at construction (select_stage), so
+requests never import modules. A request whose primary stage raises is served
+by the fallback; the analyzer only switches to the fallback for good when the
+primary itself is broken (STAGE_LOAD_ERRORS, or a failed warm-up), never
+because of one request's input.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Errors that mean the primary stage cannot work at all (missing dependency,
+# missing or unreadable model artifact), as opposed to a bad request
+STAGE_LOAD_ERRORS = (ImportError, OSError)
+
+
+class ClassifierVoiceStage:
+    """Primary voice stage: the enhanced scam classifier (compiled scorer + features)."""
+    name = "enhanced_scam_classifier"
+    is_fallback = False
+    cacheable = True
+
+    def __init__(self):
+        from ai_models.enhanced_scam_classifier import classifier
+        self.classifier = classifier
+
+    def version(self) -> str:
+        return self.classifier.serving_version
+
+    def warm_up(self, transcript: str) -> None:
+        self.classifier.ensure_trained()
+        self.classifier.predict_scam(transcript)
+
+    def score(self, transcripts: List[str]) -> Tuple[List, List, List]:
+        """(probabilities, confidences, risk factors) per transcript."""
+        batch = self.classifier.predict_scam_batch(transcripts)
+        return batch["probability"], batch["confidence"], batch["risk_factors"]
+
+
+class BasicVoiceStage:
+    """Fallback voice stage: the basic TF-IDF classifier. Results are not cached."""
+    name = "basic_scam_classifier"
+    is_fallback = True
+    cacheable = False
+    CONFIDENCE = 0.75
+
+    def __init__(self):
+        from ai_models.scam_classifier import predict_scam
+        self.predict_scam = predict_scam
+
+    def version(self) -> str:
+        return "fallback"
+
+    def warm_up(self, transcript: str) -> None:
+        self.predict_scam(transcript)
+
+    def score(self, transcripts: List[str]) -> Tuple[List, List, List]:
+        probs = [self.predict_scam(transcript) for transcript in transcripts]
+        confidences = [self.CONFIDENCE] * len(transcripts)
+        risk_factors = [["Basic pattern matching"] for _ in transcripts]
+        return probs, confidences, risk_factors
+
+
+class ModelTransactionStage:
+    """
+    Primary transaction stage: the streaming Half-Space Trees model once it
+    has seen a full window, otherwise the compiled IsolationForest. Single
+    and batch scoring always use the same model.
+    """
+    name = "anomaly_models"
+    is_fallback = False
+
+    def __init__(self):
+        from ai_models import anomaly_detector
+        from ai_models.streaming_anomaly import streaming_detector
+        self.anomaly_detector = anomaly_detector
+        self.streaming_detector = streaming_detector
+
+    def version(self) -> str:
+        # A streaming refresh changes results as much as a retrain does
+        return f"{self.anomaly_detector.model_version}+hst{self.streaming_detector.window_id}"
+
+    def warm_up(self, transaction: List) -> None:
+        self.anomaly_detector.detect_anomaly(transaction)
+
+    def flag(self, amount: float, frequency: float, is_international: int) -> Tuple[int, Optional[Dict]]:
+        """(anomaly flag, streaming score or None)."""
+        streaming = self.streaming_detector.score(amount, frequency, is_international)
+        if streaming is not None:
+            return streaming["anomaly_flag"], streaming
+        return self.anomaly_detector.detect_anomaly([amount, frequency, is_international]), None
+
+    def flag_batch(self, transactions: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """(flags, anomaly scores) for an (n, 3) array."""
+        streaming = self.streaming_detector.score_batch(transactions)
+        if streaming is not None:
+            return streaming
+        return self.anomaly_detector.detect_anomaly_batch(transactions)
+
+
+class RuleTransactionStage:
+    """Fallback transaction stage: amount and frequency rules."""
+    name = "rules"
+    is_fallback = True
+
+    def version(self) -> str:
+        return "fallback"
+
+    def warm_up(self, transaction: List) -> None:
+        pass
+
+    def flag(self, amount: float, frequency: float, is_international: int) -> Tuple[int, Optional[Dict]]:
+        return (-1 if (amount > 10000 or frequency > 5) else 1), None
+
+    def flag_batch(self, transactions: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        amounts, frequencies = transactions[:, 0], transactions[:, 1]
+        return np.where((amounts > 10000) | (frequencies > 5), -1, 1), None
+
+
+class StageTimeoutError(TimeoutError):
+    """A pipeline stage did not finish within its timeout."""
+
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"{stage} stage timed out after {timeout:g}s")
+        self.stage = stage
+        self.timeout = timeout
+
+
+def select_stage(label: str, primary, fallback):
+    """
+    Construct the primary stage, or the fallback if the primary cannot be
+    loaded (missing dependency, unreadable model artifact).
+    """
+    try:
+        return primary()
+    except Exception as e:
+        print(f"Using fallback {label}: {e}")
+        return fallback()
@@ -1,16 +1,55 @@
 import numpy as np
 from sklearn.ensemble import IsolationForest
 
-transactions = np.array([
+from ai_models.compiled_forest import FOREST_FILE, CompiledIsolationForest, verify_forest_parity
+from ai_models.model_store import hash_array, load_estimator, store
+
+ARTIFACT_NAME = "anomaly_detector"
+
+TRAINING_TRANSACTIONS = np.array([
     [500, 1, 0],
     [700, 2, 0],
     [50000, 5, 1],
     [100000, 8, 1]
 ])
 
-model = IsolationForest(contamination=0.2)
+def parity_probe():
+    # Training rows plus a fixed spread over the feature space
+    return np.vstack([
+        TRAINING_TRANSACTIONS,
+        np.random.default_rng(0).uniform([0, 0, 0], [200000, 10, 1], size=(1000, 3)).round()
+    ])
+
+def train(transactions=TRAINING_TRANSACTIONS):
+
+    model = IsolationForest(contamination=0.2, random_state=42)
+
+    model.fit(transactions)
+
+    return model
+
+def load():
+    # Serve the published artifact; fit in-process only if none exists
+    version = store.current_version()
+    directory = store.artifact_dir(ARTIFACT_NAME, version)
 
-model.fit(transactions)
+    if directory is None:
+        return train(), f"local-{hash_array(TRAINING_TRANSACTIONS)[:8]}"
+
+    return load_estimator(directory, "isolation_forest"), version
+
+def compile_model(forest, version):
+    # Real-time scoring walks flat node arrays instead of calling sklearn
+    directory = store.artifact_dir(ARTIFACT_NAME, version)
+    if directory is not None and (directory / FOREST_FILE).exists():
+        return CompiledIsolationForest.load(directory)
+    compiled = CompiledIsolationForest.from_sklearn(forest)
+    # Refuse a flattened forest whose scores differ from sklearn at all
+    verify_forest_parity(compiled, forest, parity_probe())
+    return compiled
+
+model, model_version = load()
+compiled_model = compile_model(model, model_version)
 
 def detect_anomaly(transaction):
     # Ensure transaction is 2D array with shape (n_samples, 3)
@@ -20,6 +59,27 @@ def detect_anomaly(transaction):
         if transaction.ndim == 1:
             transaction = transaction.reshape(1, -1)
     
-    pred = model.predict(transaction)
+    pred = compiled_model.predict(transaction)
+
+    return int(pred[0])
+
+def detect_anomaly_batch(transactions):
+    """
+    Score an (n, 3) array of [amount, frequency, is_international] rows in one call.
+
+    Returns:
+        (flags, scores): -1/1 per row as from model.predict, and the
+        decision_function scores (negative = anomalous, lower = more so)
+    """
+    transactions = np.asarray(transactions, dtype=np.float64)
+    if transactions.size == 0:
+        # sklearn rejects empty input
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    if transactions.ndim == 1:
+        transactions = transactions.reshape(1, -1)
+
+    scores = model.decision_function(transactions)
+    # Same rule as IsolationForest.predict, without scoring twice
+    flags = np.where(scores < 0, -1, 1)
 
-    return int(pred[0])
\ No newline at end of file
+    return flags, scores
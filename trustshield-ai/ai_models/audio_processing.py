@@ -0,0 +1,217 @@
+"""
+NumPy helpers for working on decoded 16 kHz mono audio.
+"""
+import re
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from ai_models.speech_to_text import SAMPLE_RATE
+
+_WORD_NORMALIZE = re.compile(r"[^\w']+")
+
+
+def iter_windows(n_samples: int, window_seconds: float, overlap_seconds: float,
+                 sample_rate: int = SAMPLE_RATE) -> Iterator[Tuple[int, int]]:
+    """Yield (start, end) sample ranges of fixed-size windows that overlap."""
+    window = int(window_seconds * sample_rate)
+    step = window - int(overlap_seconds * sample_rate)
+    if window <= 0 or step <= 0:
+        raise ValueError("window must be positive and longer than the overlap")
+
+    start = 0
+    while start < n_samples:
+        end = min(start + window, n_samples)
+        yield start, end
+        if end == n_samples:
+            break
+        start += step
+
+
+def frame_energy(pcm: np.ndarray, frame_seconds: float = 0.03,
+                 sample_rate: int = SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    """RMS energy of consecutive non-overlapping frames; returns (energy, frame_length)."""
+    frame = max(1, int(frame_seconds * sample_rate))
+    n_frames = len(pcm) // frame
+    frames = np.asarray(pcm[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+    return np.sqrt(np.mean(frames * frames, axis=1)), frame
+
+
+def split_at_silence(pcm: np.ndarray,
+                     target_seconds: float = 60.0,
+                     search_seconds: float = 5.0,
+                     overlap_seconds: float = 1.0,
+                     sample_rate: int = SAMPLE_RATE) -> List[Tuple[int, int]]:
+    """
+    Split audio into roughly target-length chunks, cutting at the quietest
+    frame within search_seconds of each nominal boundary so words are not
+    split. Each chunk starts overlap_seconds before its cut as a safety margin.
+
+    Returns:
+        (start, end) sample ranges in order
+    """
+    energy, frame = frame_energy(pcm, sample_rate=sample_rate)
+    target = int(target_seconds * sample_rate)
+    search = int(search_seconds * sample_rate) // frame
+    overlap = int(overlap_seconds * sample_rate)
+
+    cuts = [0]
+    nominal = target
+    while nominal < len(pcm) - target // 2:
+        center = nominal // frame
+        lo, hi = max(0, center - search), min(len(energy), center + search + 1)
+        if lo >= hi:
+            break
+        cut = (lo + int(np.argmin(energy[lo:hi]))) * frame + frame // 2
+        cuts.append(cut)
+        nominal = cut + target
+    cuts.append(len(pcm))
+
+    return [
+        (max(0, start - overlap) if i else start, end)
+        for i, (start, end) in enumerate(zip(cuts[:-1], cuts[1:]))
+    ]
+
+
+def zero_crossing_rate(pcm: np.ndarray, frame: int) -> np.ndarray:
+    """Fraction of adjacent sample pairs that change sign, per frame."""
+    n_frames = len(pcm) // frame
+    frames = np.asarray(pcm[:n_frames * frame]).reshape(n_frames, frame)
+    return np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """(start, end) index pairs of the True runs in a boolean array."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.column_stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def detect_speech(pcm: np.ndarray,
+                  frame_seconds: float = 0.03,
+                  energy_factor: float = 3.0,
+                  min_energy: float = 1e-3,
+                  max_zcr: float = 0.35,
+                  min_speech_seconds: float = 0.25,
+                  padding_seconds: float = 0.3,
+                  min_gap_seconds: float = 0.5,
+                  max_floor_ratio: float = 0.5,
+                  sample_rate: int = SAMPLE_RATE) -> List[Tuple[int, int]]:
+    """
+    Energy / zero-crossing voice activity detection.
+
+    A frame counts as speech when its RMS energy is energy_factor above the
+    recording's noise floor (10th percentile). Recordings without quiet
+    frames (a steady-level line) have no usable floor, so the threshold is
+    capped at max_floor_ratio of the 90th-percentile energy. Candidates less
+    than ten times above the threshold must also have a voice-like
+    zero-crossing rate, which rejects hiss and line noise.
+    Speech runs shorter than min_speech_seconds are dropped, the rest are
+    padded and runs closer than min_gap_seconds are merged.
+
+    Returns:
+        (start, end) sample ranges of speech in order
+    """
+    energy, frame = frame_energy(pcm, frame_seconds, sample_rate)
+    if len(energy) == 0:
+        return []
+
+    low, high = np.percentile(energy, [10, 90])
+    threshold = max(min_energy, min(energy_factor * float(low), max_floor_ratio * float(high)))
+    zcr = zero_crossing_rate(pcm, frame)
+    speech = (energy > threshold) & ((zcr < max_zcr) | (energy > 10 * threshold))
+
+    min_frames = int(min_speech_seconds * sample_rate) // frame
+    pad = int(padding_seconds * sample_rate)
+    min_gap = int(min_gap_seconds * sample_rate)
+
+    spans: List[Tuple[int, int]] = []
+    for start, end in _runs(speech):
+        if end - start < min_frames:
+            continue
+        start = max(0, int(start) * frame - pad)
+        end = min(len(pcm), int(end) * frame + pad)
+        if spans and start - spans[-1][1] < min_gap:
+            spans[-1] = (spans[-1][0], end)
+        else:
+            spans.append((start, end))
+    return spans
+
+
+class SpeechMap:
+    """
+    Maps positions in speech-only audio back to the original recording.
+    """
+
+    def __init__(self, spans: List[Tuple[int, int]], total_samples: int,
+                 sample_rate: int = SAMPLE_RATE):
+        self.spans = spans
+        self.total_samples = total_samples
+        self.sample_rate = sample_rate
+        lengths = np.array([end - start for start, end in spans], dtype=np.int64)
+        self._original_starts = np.array([start for start, _ in spans], dtype=np.int64)
+        self._speech_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if spans else lengths
+        self.speech_samples = int(lengths.sum())
+
+    @property
+    def skipped_ratio(self) -> float:
+        if not self.total_samples:
+            return 0.0
+        return 1.0 - self.speech_samples / self.total_samples
+
+    def to_original(self, seconds):
+        """Convert a time (or array of times) in the speech-only audio to original time."""
+        if not self.spans:
+            return seconds
+        samples = np.asarray(seconds, dtype=np.float64) * self.sample_rate
+        index = np.clip(np.searchsorted(self._speech_starts, samples, side="right") - 1, 0, None)
+        original = self._original_starts[index] + (samples - self._speech_starts[index])
+        return original / self.sample_rate
+
+    def stats(self) -> Dict:
+        return {
+            "audio_seconds": round(self.total_samples / self.sample_rate, 2),
+            "speech_seconds": round(self.speech_samples / self.sample_rate, 2),
+            "skipped_percent": round(100 * self.skipped_ratio, 1),
+            "speech_segments": len(self.spans)
+        }
+
+
+def remove_silence(pcm: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                   **vad_options) -> Tuple[np.ndarray, SpeechMap]:
+    """Drop non-speech audio; returns the speech-only waveform and its SpeechMap."""
+    spans = detect_speech(pcm, sample_rate=sample_rate, **vad_options)
+    speech_map = SpeechMap(spans, len(pcm), sample_rate)
+    if not spans:
+        return np.zeros(0, dtype=np.float32), speech_map
+    return np.concatenate([pcm[start:end] for start, end in spans]), speech_map
+
+
+def _normalize_word(word: str) -> str:
+    return _WORD_NORMALIZE.sub("", word.lower())
+
+
+def stitch_transcripts(parts: List[str], max_overlap_words: int = 40,
+                       min_overlap_words: int = 2) -> str:
+    """
+    Join transcripts of overlapping audio windows in order.
+
+    The longest run of words that ends one part and starts the next (compared
+    case- and punctuation-insensitively) is kept only once. Single-word
+    matches are ignored by default; they are usually coincidences.
+    """
+    words: List[str] = []
+    for part in parts:
+        new_words = part.split()
+        if not new_words:
+            continue
+
+        tail = [_normalize_word(w) for w in words[-max_overlap_words:]]
+        head = [_normalize_word(w) for w in new_words[:max_overlap_words]]
+        overlap = 0
+        for size in range(min(len(tail), len(head)), min_overlap_words - 1, -1):
+            if tail[-size:] == head[:size]:
+                overlap = size
+                break
+
+        words.extend(new_words[overlap:])
+    return " ".join(words)
@@ -1,13 +1,97 @@
 """
 Complete Call Analysis Pipeline - Audio to Risk Assessment
 """
+import asyncio
 import os
+import re
+import threading
+import time
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Dict, List, Tuple, Optional
 
+from ai_models.account_baselines import baselines
+from ai_models.analysis_stages import (
+    STAGE_LOAD_ERRORS, BasicVoiceStage, ClassifierVoiceStage, ModelTransactionStage,
+    RuleTransactionStage, StageTimeoutError, select_stage
+)
+from ai_models.audio_processing import iter_windows, remove_silence, stitch_transcripts
+from ai_models.reputation import reputation
+from ai_models.result_cache import ResultCache, make_key, normalize_transcript
+from ai_models.speech_to_text import (
+    SAMPLE_RATE, load_audio, transcribe_audio_parallel, transcribe_result
+)
+from ai_models.streaming_anomaly import streaming_detector
+from ai_models.stt_backends import get_backend
+from ai_models.velocity_engine import velocity
+from backend.services.risk_engine import DEFAULT_CONFIDENCE, calculate_detailed_risk
+
+# Transcript hints used when no transaction data is supplied
+AMOUNT_PATTERN = re.compile(r'\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)')
+URGENCY_PATTERN = re.compile('immediately|now|urgent|asap|within')
+INTERNATIONAL_PATTERN = re.compile('international|overseas|foreign|wire transfer')
+
+# Threads running the voice and transaction stages of run_full_analysis_async
+DEFAULT_STAGE_WORKERS = int(os.environ.get("TRUSTSHIELD_STAGE_WORKERS", "8"))
+
 class CallAnalyzer:
-    def __init__(self):
+    # Recordings at least this long are transcribed in parallel chunks
+    PARALLEL_TRANSCRIPTION_SECONDS = 600
+    # Transactions within one minute (including the scored one) that count as a burst
+    BURST_TRANSACTIONS_PER_MINUTE = 3
+    # Per-stage limits (seconds) for run_full_analysis_async
+    STAGE_TIMEOUTS = {"transcription": 300.0, "voice": 10.0, "transaction": 5.0}
+    
+    def __init__(self, cache_size: int = 2048, cache_ttl: float = 600.0, use_vad: bool = True,
+                 stt_backend: Optional[str] = None):
         self.demo_scenarios = self._load_demo_scenarios()
+        # Speech-to-text backend spec, see ai_models.stt_backends (None = environment default)
+        self.stt_backend = stt_backend
+        # Hold music, ringing and silence are cut out before transcription
+        self.use_vad = use_vad
+        # Replayed scripts (demos, robocall campaigns, retries) skip rescoring
+        self.cache = ResultCache(maxsize=cache_size, ttl=cache_ttl)
+        self.ready = False
+        self.warmup_report: Dict = {}
+        self._warmup_lock = threading.Lock()
+        # Primary model stages, or their fallbacks if a primary cannot load
+        self.voice_stage = select_stage("scam detection", ClassifierVoiceStage, BasicVoiceStage)
+        self.transaction_stage = select_stage(
+            "transaction analysis", ModelTransactionStage, RuleTransactionStage
+        )
+        self._voice_fallback = None     # built on first use
+        self._transaction_fallback = RuleTransactionStage()
+        # Threads are only started when async analyses are submitted
+        self._stage_executor = ThreadPoolExecutor(
+            max_workers=DEFAULT_STAGE_WORKERS, thread_name_prefix="analysis-stage"
+        )
+    
+    def _fallback_voice(self, error: Exception, permanent: bool = False):
+        """
+        Fallback voice stage for a request whose primary stage failed.
+        The primary is only replaced if it is broken (see STAGE_LOAD_ERRORS).
+        """
+        print(f"Using fallback scam detection: {error}")
+        if self._voice_fallback is None:
+            self._voice_fallback = BasicVoiceStage()
+        if permanent or isinstance(error, STAGE_LOAD_ERRORS):
+            self.voice_stage = self._voice_fallback
+        return self._voice_fallback
+    
+    def _fallback_transaction(self, error: Exception, permanent: bool = False):
+        """Rule-based transaction stage for a request whose primary stage failed."""
+        print(f"Transaction analysis failed: {error}")
+        if permanent or isinstance(error, STAGE_LOAD_ERRORS):
+            self.transaction_stage = self._transaction_fallback
+        return self._transaction_fallback
+    
+    def stage_report(self) -> Dict:
+        """Which implementation serves each model stage."""
+        return {
+            "voice": self.voice_stage.name,
+            "transaction": self.transaction_stage.name
+        }
     
     def _load_demo_scenarios(self) -> Dict:
         """Pre-configured demo scenarios for reliable hackathon demos."""
@@ -44,66 +128,307 @@ class CallAnalyzer:
             }
         }
     
+    def warm_up(self, include_speech: bool = True) -> Dict:
+        """
+        Load every model once and run a dummy inference through each.
+        Safe to call concurrently; only the first caller does the work.
+        
+        Returns:
+            Per-model status and timing report
+        """
+        with self._warmup_lock:
+            if self.ready:
+                return self.warmup_report
+            
+            scenario = self.demo_scenarios["bank_scam"]
+            report = {}
+            
+            def timed(name, func):
+                start = time.perf_counter()
+                try:
+                    func()
+                    status = "ready"
+                except Exception as e:
+                    print(f"Warm-up of {name} failed: {e}")
+                    status = f"unavailable: {e}"
+                report[name] = {
+                    "status": status,
+                    "seconds": round(time.perf_counter() - start, 3)
+                }
+            
+            # Warm-up inputs are known to be valid, so a failure means the model is broken
+            def warm_classifier():
+                try:
+                    self.voice_stage.warm_up(scenario["transcript"])
+                except Exception as e:
+                    if self.voice_stage.is_fallback:
+                        raise
+                    self._fallback_voice(e, permanent=True).warm_up(scenario["transcript"])
+            
+            def warm_anomaly():
+                try:
+                    self.transaction_stage.warm_up(scenario["transaction"])
+                except Exception as e:
+                    if self.transaction_stage.is_fallback:
+                        raise
+                    self._fallback_transaction(e, permanent=True)
+            
+            def warm_speech():
+                get_backend(self.stt_backend).warm_up()
+            
+            timed("scam_classifier", warm_classifier)
+            timed("anomaly_detector", warm_anomaly)
+            if include_speech:
+                # Audio falls back to demo transcripts, so a missing speech model is not fatal
+                timed("speech_to_text", warm_speech)
+            
+            self.warmup_report = report
+            self.ready = True
+            return report
+    
+    def transcribe(self, audio) -> Tuple[str, float]:
+        """
+        Transcribe an audio file path or decoded 16 kHz waveform.
+        Raises on failure - use analyze_audio_file for the demo fallback.
+        """
+        result = self.transcribe_detailed(audio)
+        return result["transcript"], result["confidence"]
+    
+    def transcription_settings(self) -> Dict:
+        """Settings a transcript depends on, to tag and validate cached transcripts."""
+        return {"stt_backend": get_backend(self.stt_backend).name, "use_vad": self.use_vad}
+    
+    def _speech_only(self, pcm: np.ndarray):
+        """Apply the VAD pre-pass if enabled; returns (speech pcm, SpeechMap or None)."""
+        if not self.use_vad:
+            return pcm, None
+        return remove_silence(pcm)
+    
+    def transcribe_detailed(self, audio) -> Dict:
+        """
+        Transcribe audio with the VAD pre-pass.
+        
+        Returns:
+            transcript, confidence, segments (timed against the original
+            audio) and VAD statistics (None when VAD is disabled)
+        """
+        pcm = load_audio(audio) if isinstance(audio, (str, os.PathLike)) else audio
+        speech, speech_map = self._speech_only(pcm)
+        
+        if len(speech) == 0:
+            transcript, segments, confidence = "", [], 0.0
+        else:
+            if len(speech) >= self.PARALLEL_TRANSCRIPTION_SECONDS * SAMPLE_RATE:
+                result = transcribe_audio_parallel(speech, backend=self.stt_backend)
+            else:
+                result = transcribe_result(speech, self.stt_backend)
+            transcript, segments, confidence = result.text, result.segments, result.confidence
+            if speech_map is not None:
+                for segment in segments:
+                    segment["start"] = round(float(speech_map.to_original(segment["start"])), 2)
+                    segment["end"] = round(float(speech_map.to_original(segment["end"])), 2)
+        
+        return {
+            "transcript": transcript,
+            "confidence": confidence,
+            "segments": segments,
+            "vad": speech_map.stats() if speech_map is not None else None
+        }
+    
     def analyze_audio_file(self, audio_path: str) -> Tuple[str, float]:
         """
         Transcribe audio file and return transcript with confidence.
         Falls back to demo scenario if file doesn't exist.
         """
         try:
-            from ai_models.speech_to_text import transcribe_audio
-            transcript = transcribe_audio(audio_path)
-            confidence = 0.95
-            return transcript, confidence
+            return self.transcribe(audio_path)
         except Exception as e:
             print(f"Audio transcription failed: {e}")
             # Return a demo scenario
             scenario = self.demo_scenarios["bank_scam"]
             return scenario["transcript"], 0.85
     
+    def analyze_audio_streaming(self,
+                                audio,
+                                window_seconds: float = 30.0,
+                                overlap_seconds: float = 5.0,
+                                stop_threshold: float = 0.85) -> Dict:
+        """
+        Transcribe audio window by window, scoring the transcript so far after
+        each window, and stop as soon as the fraud probability reaches
+        stop_threshold.
+        
+        Args:
+            audio: Audio file path or decoded 16 kHz waveform
+            window_seconds: Length of each transcription window
+            overlap_seconds: Overlap between consecutive windows
+            stop_threshold: Fraud probability that ends processing early
+        
+        Returns:
+            Transcript, its confidence, voice analysis and how much audio was processed
+        """
+        pcm = load_audio(audio) if isinstance(audio, (str, os.PathLike)) else audio
+        speech, speech_map = self._speech_only(pcm)
+        
+        parts = []
+        confidences = []
+        transcript = ""
+        voice_analysis = None
+        processed_samples = 0
+        early_stopped = False
+        
+        for start, end in iter_windows(len(speech), window_seconds, overlap_seconds):
+            result = transcribe_result(speech[start:end], self.stt_backend)
+            parts.append(result.text)
+            confidences.append((result.confidence, end - start))
+            processed_samples = end
+            transcript = stitch_transcripts(parts)
+            if not transcript:
+                continue
+            
+            voice_analysis = self.analyze_transcript(transcript)
+            if voice_analysis["fraud_probability"] >= stop_threshold:
+                early_stopped = end < len(speech)
+                break
+        
+        # Progress is reported on the original recording's timeline
+        if speech_map is not None:
+            processed_seconds = 0.0
+            if processed_samples:
+                processed_seconds = float(speech_map.to_original(processed_samples / SAMPLE_RATE))
+            if not early_stopped:
+                processed_seconds = len(pcm) / SAMPLE_RATE
+        else:
+            processed_seconds = processed_samples / SAMPLE_RATE
+        
+        if voice_analysis is None:
+            voice_analysis = self.analyze_transcript(transcript)
+        
+        confidence = 0.0
+        if confidences:
+            scores, weights = zip(*confidences)
+            confidence = round(float(np.average(scores, weights=weights)), 4)
+        
+        return {
+            "transcript": transcript,
+            "confidence": confidence,
+            "voice_analysis": voice_analysis,
+            "streaming": {
+                "windows_processed": len(parts),
+                "audio_processed_seconds": round(processed_seconds, 2),
+                "audio_total_seconds": round(len(pcm) / SAMPLE_RATE, 2),
+                "early_stopped": early_stopped,
+                "stop_threshold": stop_threshold
+            },
+            "vad": speech_map.stats() if speech_map is not None else None
+        }
+    
     def analyze_transcript(self, transcript: str) -> Dict:
         """
         Analyze transcript for scam indicators.
         Returns detailed analysis with probability, confidence, and risk factors.
         """
+        return self.analyze_transcripts([transcript])[0]
+    
+    def analyze_transcripts(self, transcripts: List[str]) -> List[Dict]:
+        """
+        Analyze a batch of transcripts with a single classifier pass.
+        Previously seen transcripts are served from the result cache.
+        Returns one analysis dict per transcript, in input order.
+        """
+        self.cache.ensure_version(self._model_version())
+        keys = [make_key("transcript", normalize_transcript(t)) for t in transcripts]
+        results = [self.cache.get(key) for key in keys]
+        
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            computed, cacheable = self._score_transcripts([transcripts[i] for i in missing])
+            for i, result in zip(missing, computed):
+                results[i] = result
+                if cacheable:
+                    self.cache.put(keys[i], result)
+        
+        for transcript, result in zip(transcripts, results):
+            result["transcript"] = transcript
+        
+        return results
+    
+    def _score_transcripts(self, transcripts: List[str]) -> Tuple[List[Dict], bool]:
+        """Run the voice stage over transcripts; also reports whether the results may be cached."""
+        stage = self.voice_stage
         try:
-            from ai_models.enhanced_scam_classifier import predict_scam_detailed
-            prob, confidence, risk_factors = predict_scam_detailed(transcript)
+            probs, confidences, risk_factors = stage.score(transcripts)
         except Exception as e:
-            print(f"Using fallback scam detection: {e}")
-            from ai_models.scam_classifier import predict_scam
-            prob = predict_scam(transcript)
-            confidence = 0.75
-            risk_factors = ["Basic pattern matching"]
+            if stage.is_fallback:
+                raise
+            stage = self._fallback_voice(e)
+            probs, confidences, risk_factors = stage.score(transcripts)
         
-        return {
-            "fraud_probability": float(prob),
-            "confidence": float(confidence),
-            "risk_factors": risk_factors,
-            "transcript": transcript
-        }
+        return [
+            {
+                "fraud_probability": float(prob),
+                "confidence": float(confidence),
+                "risk_factors": factors,
+                "transcript": transcript
+            }
+            for transcript, prob, confidence, factors
+            in zip(transcripts, probs, confidences, risk_factors)
+        ], stage.cacheable
+    
+    def _model_version(self) -> str:
+        """Version tag of the serving models, used to key and invalidate the cache."""
+        return f"{self.voice_stage.version()}|{self.transaction_stage.version()}"
+    
+    def cache_stats(self) -> Dict:
+        """Hit-rate statistics for the result cache."""
+        return self.cache.stats()
     
-    def analyze_transaction(self, amount: float, frequency: int, is_international: int) -> Dict:
+    def analyze_transaction(self, amount: float, frequency: int, is_international: int,
+                            account_id: Optional[str] = None) -> Dict:
         """
         Analyze transaction for anomalies.
+        With an account_id the frequency is the account's server-side 24h
+        velocity (the caller's value is ignored), and the transaction is
+        compared to that account's own history; accounts without enough
+        history fall back to the global model. Accounts learn only from
+        ingested events (see ingest_transaction), not from scoring.
         Returns flag and risk indicators.
         """
-        try:
-            from ai_models.anomaly_detector import detect_anomaly
-            flag = detect_anomaly([amount, frequency, is_international])
-        except Exception as e:
-            print(f"Transaction analysis failed: {e}")
-            # Simple rule-based fallback
-            flag = -1 if (amount > 10000 or frequency > 5) else 1
-        
-        risk_indicators = []
-        if amount > 10000:
-            risk_indicators.append(f"Large transaction amount: ${amount:,.2f}")
-        if frequency > 3:
-            risk_indicators.append(f"High frequency: {frequency} transactions")
-        if is_international == 1:
-            risk_indicators.append("International transfer")
+        baseline = None
+        streaming = None
+        velocity_features = None
+        if account_id is not None:
+            velocity_features = velocity.features(account_id)
+            # The scored transaction itself is not ingested yet
+            frequency = velocity_features["count_24h"] + 1
+            baseline = baselines.score(account_id, amount, frequency, is_international)
         
-        return {
+        if baseline is not None:
+            flag = baseline["anomaly_flag"]
+            risk_indicators = baseline.pop("reasons")
+        else:
+            stage = self.transaction_stage
+            try:
+                flag, streaming = stage.flag(amount, frequency, is_international)
+            except Exception as e:
+                if stage.is_fallback:
+                    raise
+                flag, streaming = self._fallback_transaction(e).flag(amount, frequency, is_international)
+            
+            risk_indicators = []
+            if amount > 10000:
+                risk_indicators.append(f"Large transaction amount: ${amount:,.2f}")
+            if frequency > 3:
+                risk_indicators.append(f"High frequency: {frequency} transactions")
+            if is_international == 1:
+                risk_indicators.append("International transfer")
+        
+        if velocity_features is not None:
+            burst = velocity_features["count_1m"] + 1
+            if burst >= self.BURST_TRANSACTIONS_PER_MINUTE:
+                risk_indicators.append(f"Velocity burst: {burst} transactions within one minute")
+        
+        result = {
             "anomaly_flag": int(flag),
             "is_anomalous": flag == -1,
             "risk_indicators": risk_indicators,
@@ -113,17 +438,86 @@ class CallAnalyzer:
                 "is_international": bool(is_international)
             }
         }
+        if streaming is not None:
+            result["streaming_anomaly"] = streaming
+        if account_id is not None:
+            result["baseline"] = dict(baseline or {}, source="account" if baseline else "global")
+            result["velocity"] = velocity_features
+        return result
     
-    def calculate_final_risk(self, voice_analysis: Dict, transaction_analysis: Dict) -> Dict:
+    def analyze_transactions_batch(self, transactions) -> List[Dict]:
         """
-        Calculate final risk score combining voice and transaction analysis.
+        Analyze many transactions with one model call.
+        transactions is an (n, 3) array of [amount, frequency, is_international].
+        Returns one dict per row, shaped like analyze_transaction plus the
+        continuous anomaly_score from the same model analyze_transaction uses
+        (low = anomalous; None when the rule-based fallback is used).
         """
-        from backend.services.risk_engine import calculate_risk
+        transactions = np.asarray(transactions, dtype=np.float64).reshape(-1, 3)
+        if len(transactions) == 0:
+            return []
+        amounts, frequencies, international = transactions.T
+        
+        stage = self.transaction_stage
+        try:
+            flags, scores = stage.flag_batch(transactions)
+        except Exception as e:
+            if stage.is_fallback:
+                raise
+            flags, scores = self._fallback_transaction(e).flag_batch(transactions)
         
+        risk_indicators = [[] for _ in range(len(transactions))]
+        for i in np.flatnonzero(amounts > 10000):
+            risk_indicators[i].append(f"Large transaction amount: ${amounts[i]:,.2f}")
+        for i in np.flatnonzero(frequencies > 3):
+            risk_indicators[i].append(f"High frequency: {frequencies[i]:g} transactions")
+        for i in np.flatnonzero(international == 1):
+            risk_indicators[i].append("International transfer")
+        
+        flags = flags.tolist()
+        scores = scores.tolist() if scores is not None else [None] * len(flags)
+        return [
+            {
+                "anomaly_flag": flag,
+                "is_anomalous": flag == -1,
+                "anomaly_score": score,
+                "risk_indicators": indicators,
+                "transaction_data": {
+                    "amount": amount,
+                    "frequency": frequency,
+                    "is_international": bool(is_international)
+                }
+            }
+            for flag, score, indicators, (amount, frequency, is_international)
+            in zip(flags, scores, risk_indicators, transactions.tolist())
+        ]
+    
+    def ingest_transaction(self, account_id: str, amount: float, is_international: int,
+                           timestamp: Optional[float] = None) -> None:
+        """
+        Record a completed transaction in the account's velocity windows and
+        baseline, and in the streaming anomaly model.
+        """
+        velocity.record(account_id, amount, timestamp)
+        frequency = velocity.features(account_id, timestamp)["count_24h"]
+        baselines.update(account_id, amount, frequency, is_international, timestamp)
+        streaming_detector.learn(amount, frequency, is_international)
+    
+    def calculate_final_risk(self, voice_analysis: Dict, transaction_analysis: Dict,
+                             behavioral_factors: Optional[Dict] = None) -> Dict:
+        """
+        Calculate final risk score combining voice and transaction analysis,
+        adjusted by caller/account behavioural factors when they are known.
+        """
         voice_prob = voice_analysis.get("fraud_probability", 0)
-        transaction_flag = transaction_analysis.get("anomaly_flag", 1)
         
-        risk_score, risk_level = calculate_risk(voice_prob, transaction_flag)
+        # Scored at the engine's default confidence; voice confidence is reported separately
+        detailed = calculate_detailed_risk(
+            {"fraud_probability": voice_prob, "confidence": DEFAULT_CONFIDENCE},
+            transaction_analysis,
+            behavioral_factors
+        )
+        risk_score, risk_level = detailed["risk_score"], detailed["risk_level"]
         
         # Compile all alerts
         alerts = []
@@ -145,6 +539,15 @@ class CallAnalyzer:
         for indicator in transaction_analysis.get("risk_indicators", []):
             alerts.append(f"💰 Transaction: {indicator}")
         
+        # Caller/account reputation alerts
+        behavioral_factors = behavioral_factors or {}
+        if behavioral_factors.get("known_scammer_pattern"):
+            alerts.append("☎️ Caller: Number is on the known scam list")
+        if behavioral_factors.get("repeat_caller"):
+            alerts.append("☎️ Caller: Repeated calls from this number")
+        if behavioral_factors.get("verified_customer"):
+            alerts.append("🪪 Account: Verified customer")
+        
         # Risk level alerts
         if risk_level == "Critical":
             alerts.append("🛑 FRAUD DETECTED - Recommend immediate account freeze")
@@ -158,6 +561,9 @@ class CallAnalyzer:
             "risk_level": risk_level,
             "alerts": alerts,
             "voice_confidence": voice_analysis.get("confidence", 0),
+            "base_score": float(detailed["base_score"]),
+            "behavioral_adjustment": detailed["behavioral_adjustment"],
+            "behavioral_factors": behavioral_factors,
             "recommendation": self._get_recommendation(risk_level, risk_score)
         }
     
@@ -174,7 +580,10 @@ class CallAnalyzer:
                          audio_path: Optional[str] = None,
                          transcript: Optional[str] = None,
                          transaction_data: Optional[List] = None,
-                         demo_scenario: Optional[str] = None) -> Dict:
+                         demo_scenario: Optional[str] = None,
+                         audio_confidence: Optional[float] = None,
+                         caller_id: Optional[str] = None,
+                         account_id: Optional[str] = None) -> Dict:
         """
         Run complete end-to-end analysis pipeline.
         
@@ -183,6 +592,12 @@ class CallAnalyzer:
             transcript: Pre-provided transcript (optional)
             transaction_data: [amount, frequency, is_international] (optional)
             demo_scenario: Name of demo scenario to use (optional)
+            audio_confidence: Confidence of a pre-provided transcript that came
+                from audio (optional, defaults to 1.0)
+            caller_id: Calling number, for reputation lookups (optional)
+            account_id: Customer account, for reputation lookups and the
+                account's velocity and baseline (optional; the transaction
+                frequency then comes from the account's 24h velocity)
         
         Returns:
             Complete analysis results
@@ -202,24 +617,35 @@ class CallAnalyzer:
                 scenario = self.demo_scenarios["bank_scam"]
                 transcript = scenario["transcript"]
                 audio_confidence = 0.85
-        else:
+        elif audio_confidence is None:
             audio_confidence = 1.0
         
-        # Step 2: Analyze transcript for scam indicators
-        voice_analysis = self.analyze_transcript(transcript)
-        
-        # Step 3: Analyze transaction
         if transaction_data is None:
             # Extract transaction hints from transcript or use defaults
             transaction_data = self._extract_transaction_from_transcript(transcript)
         
-        transaction_analysis = self.analyze_transaction(*transaction_data)
+        behavioral_factors = self._lookup_reputation(caller_id, account_id)
+        
+        self.cache.ensure_version(self._model_version())
+        cache_key = self._full_cache_key(
+            transcript, transaction_data, audio_confidence, behavioral_factors, account_id
+        )
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            cached["transcript"] = transcript
+            return cached
+        
+        # Step 2: Analyze transcript for scam indicators
+        voice_analysis = self.analyze_transcript(transcript)
+        
+        # Step 3: Analyze transaction
+        transaction_analysis = self.analyze_transaction(*transaction_data, account_id=account_id)
         
         # Step 4: Calculate final risk
-        final_risk = self.calculate_final_risk(voice_analysis, transaction_analysis)
+        final_risk = self.calculate_final_risk(voice_analysis, transaction_analysis, behavioral_factors)
         
         # Compile complete results
-        return {
+        result = {
             "transcript": transcript,
             "audio_confidence": audio_confidence,
             "voice_analysis": voice_analysis,
@@ -227,22 +653,214 @@ class CallAnalyzer:
             "final_risk": final_risk,
             "pipeline_status": "success"
         }
+        self.cache.put(cache_key, result)
+        
+        return result
+    
+    def _lookup_reputation(self, caller_id: Optional[str], account_id: Optional[str]) -> Optional[Dict]:
+        """Behavioural factors for the call; the call itself is counted after the lookup."""
+        if not (caller_id or account_id):
+            return None
+        behavioral_factors = reputation.behavioral_factors(caller_id, account_id)
+        if caller_id:
+            reputation.record_call(caller_id)
+        return behavioral_factors
+    
+    def _full_cache_key(self, transcript: str, transaction_data: List,
+                        audio_confidence: float, behavioral_factors: Optional[Dict],
+                        account_id: Optional[str] = None) -> str:
+        # An account's result depends on its velocity, which changes with every
+        # ingested event and as windows expire; the baseline only changes with events
+        account_state = None
+        if account_id is not None:
+            account_state = (account_id, tuple(sorted(velocity.features(account_id).items())))
+        return make_key(
+            "full", normalize_transcript(transcript),
+            tuple(float(value) for value in transaction_data), audio_confidence,
+            tuple(sorted(behavioral_factors.items())) if behavioral_factors else None,
+            account_state
+        )
+    
+    async def run_full_analysis_async(self,
+                                      audio_path: Optional[str] = None,
+                                      transcript: Optional[str] = None,
+                                      transaction_data: Optional[List] = None,
+                                      demo_scenario: Optional[str] = None,
+                                      audio_confidence: Optional[float] = None,
+                                      caller_id: Optional[str] = None,
+                                      account_id: Optional[str] = None,
+                                      stage_timeouts: Optional[Dict[str, float]] = None) -> Dict:
+        """
+        run_full_analysis with the voice branch (transcription, then scoring)
+        and the transaction branch running concurrently on the stage executor.
+        The transaction branch only waits for the transcript when it has to
+        extract transaction hints from it.
+        
+        Args:
+            Same as run_full_analysis, plus
+            stage_timeouts: Overrides for STAGE_TIMEOUTS, by stage name
+        
+        Returns:
+            run_full_analysis results plus a "timing" section with per-stage
+            durations and the critical path (the branch that finished last)
+        
+        Raises:
+            StageTimeoutError: a stage exceeded its timeout (its thread is
+                not interrupted; the result is discarded)
+        """
+        timeouts = dict(self.STAGE_TIMEOUTS, **(stage_timeouts or {}))
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        stages = {}
+        
+        async def run_stage(name, func, *args):
+            stage_started = time.perf_counter()
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self._stage_executor, func, *args), timeouts[name]
+                )
+            except asyncio.TimeoutError:
+                raise StageTimeoutError(name, timeouts[name]) from None
+            finally:
+                finished = time.perf_counter()
+                stages[name] = {
+                    "seconds": round(finished - stage_started, 4),
+                    "finished_at": round(finished - started, 4)
+                }
+        
+        # Same input resolution as run_full_analysis
+        if demo_scenario and demo_scenario in self.demo_scenarios:
+            scenario = self.demo_scenarios[demo_scenario]
+            transcript = scenario["transcript"]
+            transaction_data = scenario["transaction"]
+        
+        if transcript is None and not audio_path:
+            transcript = self.demo_scenarios["bank_scam"]["transcript"]
+            audio_confidence = 0.85
+        elif transcript is not None and audio_confidence is None:
+            audio_confidence = 1.0
+        
+        behavioral_factors = self._lookup_reputation(caller_id, account_id)
+        self.cache.ensure_version(self._model_version())
+        
+        if transcript is not None:
+            if transaction_data is None:
+                transaction_data = self._extract_transaction_from_transcript(transcript)
+            cached = self.cache.get(self._full_cache_key(
+                transcript, transaction_data, audio_confidence, behavioral_factors, account_id
+            ))
+            if cached is not None:
+                cached["transcript"] = transcript
+                cached["timing"] = {
+                    "cache_hit": True,
+                    "total_seconds": round(time.perf_counter() - started, 4)
+                }
+                return cached
+        
+        needs_transcription = transcript is None
+        # Transaction hints can only be extracted once the audio is transcribed
+        transaction_waits = needs_transcription and transaction_data is None
+        transcript_ready = asyncio.Event()
+        if not needs_transcription:
+            transcript_ready.set()
+        
+        async def voice_branch():
+            nonlocal transcript, audio_confidence
+            if transcript is None:
+                transcript, audio_confidence = await run_stage(
+                    "transcription", self.analyze_audio_file, audio_path
+                )
+                transcript_ready.set()
+            return await run_stage("voice", self.analyze_transcript, transcript)
+        
+        async def transaction_branch():
+            data = transaction_data
+            if data is None:
+                await transcript_ready.wait()
+                data = self._extract_transaction_from_transcript(transcript)
+            return data, await run_stage(
+                "transaction", partial(self.analyze_transaction, account_id=account_id), *data
+            )
+        
+        tasks = [asyncio.ensure_future(voice_branch()), asyncio.ensure_future(transaction_branch())]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+        
+        voice_analysis = tasks[0].result()
+        transaction_data, transaction_analysis = tasks[1].result()
+        
+        voice_path = (["transcription"] if needs_transcription else []) + ["voice"]
+        transaction_path = (["transcription"] if transaction_waits else []) + ["transaction"]
+        
+        risk_started = time.perf_counter()
+        final_risk = self.calculate_final_risk(voice_analysis, transaction_analysis, behavioral_factors)
+        
+        result = {
+            "transcript": transcript,
+            "audio_confidence": audio_confidence,
+            "voice_analysis": voice_analysis,
+            "transaction_analysis": transaction_analysis,
+            "final_risk": final_risk,
+            "pipeline_status": "success"
+        }
+        self.cache.put(self._full_cache_key(
+            transcript, transaction_data, audio_confidence, behavioral_factors, account_id
+        ), result)
+        
+        finished = time.perf_counter()
+        stages["risk"] = {
+            "seconds": round(finished - risk_started, 4),
+            "finished_at": round(finished - started, 4)
+        }
+        # The branch that finished last set the latency
+        critical_path = max(
+            (voice_path, transaction_path), key=lambda path: stages[path[-1]]["finished_at"]
+        )
+        result["timing"] = {
+            "cache_hit": False,
+            "stages": stages,
+            "critical_path": critical_path + ["risk"],
+            "sum_of_stages_seconds": round(sum(stage["seconds"] for stage in stages.values()), 4),
+            "total_seconds": round(finished - started, 4)
+        }
+        return result
+    
+    def run_streaming_analysis(self,
+                               audio,
+                               transaction_data: Optional[List] = None,
+                               **streaming_options) -> Dict:
+        """
+        End-to-end analysis that transcribes incrementally and may stop early.
+        Same result shape as run_full_analysis plus a "streaming" section.
+        """
+        streamed = self.analyze_audio_streaming(audio, **streaming_options)
+        
+        result = self.run_full_analysis(
+            transcript=streamed["transcript"],
+            transaction_data=transaction_data,
+            audio_confidence=streamed["confidence"]
+        )
+        result["streaming"] = streamed["streaming"]
+        result["vad"] = streamed["vad"]
+        return result
     
     def _extract_transaction_from_transcript(self, transcript: str) -> List:
         """Extract transaction details from transcript using pattern matching."""
-        import re
+        lowered = transcript.lower()
         
-        # Look for dollar amounts
-        amounts = re.findall(r'\$?(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)', transcript)
-        amount = float(amounts[0].replace(',', '')) if amounts else 1000
+        # First dollar amount mentioned
+        match = AMOUNT_PATTERN.search(transcript)
+        amount = float(match.group(1).replace(',', '')) if match else 1000
         
         # Detect urgency/frequency indicators
-        urgency_words = ['immediately', 'now', 'urgent', 'asap', 'within']
-        frequency = 3 if any(word in transcript.lower() for word in urgency_words) else 1
+        frequency = 3 if URGENCY_PATTERN.search(lowered) else 1
         
         # Detect international indicators
-        international_words = ['international', 'overseas', 'foreign', 'wire transfer']
-        is_international = 1 if any(word in transcript.lower() for word in international_words) else 0
+        is_international = 1 if INTERNATIONAL_PATTERN.search(lowered) else 0
         
         return [amount, frequency, is_international]
 
@@ -0,0 +1,155 @@
+"""
+Pure-NumPy inference for the IsolationForest transaction anomaly detector.
+
+Every tree of the fitted forest is flattened into shared node arrays
+(feature, threshold, left, right and the leaf's path-length value) with one
+root per tree. Scoring walks all trees at once, one tree level per step, so
+a single transaction costs a handful of small array operations instead of
+sklearn's input validation and per-estimator Python loop.
+
+Scores are bit-for-bit identical to sklearn: inputs are rounded to float32
+like sklearn's trees do, and per-tree path lengths are added in tree order.
+"""
+from pathlib import Path
+
+import numpy as np
+
+FOREST_FILE = "forest.npz"
+
+
+class CompiledIsolationForest:
+    """Scores transactions from flattened IsolationForest node arrays."""
+
+    def __init__(self, feature, threshold, left, right, leaf_value, roots,
+                 max_depth: int, denominator: float, offset: float):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.denominator = float(denominator)
+        self.offset = float(offset)
+        # children[node, 0] is the left child, children[node, 1] the right
+        self.children = np.column_stack((self.left, self.right))
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Export a fitted sklearn IsolationForest."""
+        from sklearn.ensemble._iforest import _average_path_length
+
+        subsample_features = forest._max_features != forest.n_features_in_
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        max_depth = 0
+        base = 0
+
+        for tree_idx, (estimator, tree_features) in enumerate(
+                zip(forest.estimators_, forest.estimators_features_)):
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+
+            feature = np.where(is_leaf, 0, tree.feature)
+            if subsample_features:
+                # Trees see a column subset; map back to the original columns
+                feature = np.asarray(tree_features)[feature]
+
+            nodes = np.arange(tree.node_count)
+            # Leaves point at themselves, so extra traversal steps are no-ops
+            features.append(feature)
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(base + np.where(is_leaf, nodes, tree.children_left))
+            rights.append(base + np.where(is_leaf, nodes, tree.children_right))
+            # Same expression and order as sklearn's per-tree depth update
+            values.append(
+                forest._decision_path_lengths[tree_idx]
+                + forest._average_path_length_per_tree[tree_idx]
+                - 1.0
+            )
+            roots.append(base)
+            max_depth = max(max_depth, tree.max_depth)
+            base += tree.node_count
+
+        denominator = len(forest.estimators_) * _average_path_length([forest._max_samples])
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            leaf_value=np.concatenate(values),
+            roots=roots,
+            max_depth=max_depth,
+            denominator=float(np.ravel(denominator)[0]),
+            offset=forest.offset_
+        )
+
+    def save(self, directory: Path) -> None:
+        """Write the node arrays next to the estimator artifact."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            directory / FOREST_FILE,
+            feature=self.feature, threshold=self.threshold,
+            left=self.left, right=self.right, leaf_value=self.leaf_value,
+            roots=self.roots, max_depth=self.max_depth,
+            denominator=self.denominator, offset=self.offset
+        )
+
+    @classmethod
+    def load(cls, directory: Path):
+        with np.load(Path(directory) / FOREST_FILE) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+    def score_samples(self, X) -> np.ndarray:
+        """Same as IsolationForest.score_samples (higher = more normal)."""
+        # Trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+
+        if X.shape[0] == 1:
+            # Real-time path: one node per tree, no row bookkeeping
+            x = X[0]
+            node = self.roots
+            for _ in range(self.max_depth):
+                go_right = x[self.feature[node]] > self.threshold[node]
+                node = self.children[node, go_right.view(np.int8)]
+            node = node[:, None]
+        else:
+            rows = np.arange(X.shape[0])
+            node = np.repeat(self.roots[:, None], X.shape[0], axis=1)
+            for _ in range(self.max_depth):
+                go_right = X[rows, self.feature[node]] > self.threshold[node]
+                node = self.children[node, go_right.view(np.int8)]
+
+        # cumsum adds strictly in tree order, like sklearn's running total
+        depths = np.cumsum(self.leaf_value[node], axis=0)[-1]
+        if self.denominator == 0:
+            # sklearn substitutes 1 for depths / denominator: 2 ** -1
+            return -0.5 * np.ones_like(depths)
+        return -(2 ** (-depths / self.denominator))
+
+    def decision_function(self, X) -> np.ndarray:
+        """Same as IsolationForest.decision_function (negative = anomalous)."""
+        return self.score_samples(X) - self.offset
+
+    def predict(self, X) -> np.ndarray:
+        return np.where(self.decision_function(X) < 0, -1, 1)
+
+
+def verify_forest_parity(compiled: CompiledIsolationForest, forest, X) -> float:
+    """
+    Check the compiled forest against sklearn on X.
+
+    Returns:
+        The largest absolute decision_function difference (0.0 when exact)
+
+    Raises:
+        ValueError if any score differs
+    """
+    expected = forest.decision_function(X)
+    actual = compiled.decision_function(X)
+    max_diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    if max_diff != 0.0:
+        raise ValueError(f"Compiled forest diverges from sklearn by {max_diff:.3g}")
+    return max_diff
@@ -0,0 +1,163 @@
+"""
+Pure-NumPy inference for the TF-IDF + logistic regression scam classifier.
+
+The trained vectorizer and model are folded into one weight per n-gram
+(coefficient x IDF), so scoring a transcript is tokenize, count, one dot
+product and a sigmoid - no sklearn import or input validation per call.
+"""
+import json
+import re
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+SCORER_FILE = "scorer.json"
+FOLDED_FILE = "folded.npy"
+
+# Largest acceptable |compiled - sklearn| probability difference at export
+PARITY_TOLERANCE = 1e-9
+
+
+class CompiledScamScorer:
+    """Scores transcripts from folded TF-IDF/logistic weights."""
+
+    def __init__(self, vocabulary: Dict[str, int], idf, folded, intercept: float,
+                 ngram_range=(1, 1), token_pattern=r"(?u)\b\w\w+\b",
+                 lowercase=True, norm="l2", sublinear_tf=False):
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+        self.folded = np.asarray(folded, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.ngram_range = tuple(ngram_range)
+        self.token_pattern = token_pattern
+        self.lowercase = lowercase
+        self.norm = norm
+        self.sublinear_tf = sublinear_tf
+        self._token_re = re.compile(token_pattern)
+
+    @classmethod
+    def from_sklearn(cls, vectorizer, model):
+        """Export a fitted TfidfVectorizer + binary LogisticRegression."""
+        if vectorizer.analyzer != "word" or vectorizer.stop_words is not None:
+            raise ValueError("Only word analyzers without stop words can be compiled")
+        if vectorizer.preprocessor is not None or vectorizer.tokenizer is not None:
+            raise ValueError("Custom preprocessors/tokenizers cannot be compiled")
+        if vectorizer.norm not in ("l2", None) or not vectorizer.use_idf:
+            raise ValueError("Only l2/no normalisation with IDF weighting can be compiled")
+        if len(model.classes_) != 2:
+            raise ValueError("Only binary classifiers can be compiled")
+
+        idf = np.asarray(vectorizer.idf_, dtype=np.float64)
+        return cls(
+            vocabulary={term: int(index) for term, index in vectorizer.vocabulary_.items()},
+            idf=idf,
+            folded=np.asarray(model.coef_[0], dtype=np.float64) * idf,
+            intercept=float(model.intercept_[0]),
+            ngram_range=vectorizer.ngram_range,
+            token_pattern=vectorizer.token_pattern,
+            lowercase=vectorizer.lowercase,
+            norm=vectorizer.norm,
+            sublinear_tf=vectorizer.sublinear_tf
+        )
+
+    def save(self, directory: Path) -> None:
+        """Write the scorer next to the text model artifacts."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / FOLDED_FILE, self.folded)
+        with open(directory / SCORER_FILE, "w") as f:
+            json.dump({
+                "intercept": self.intercept,
+                "ngram_range": list(self.ngram_range),
+                "token_pattern": self.token_pattern,
+                "lowercase": self.lowercase,
+                "norm": self.norm,
+                "sublinear_tf": self.sublinear_tf
+            }, f)
+
+    @classmethod
+    def load(cls, directory: Path):
+        """Load a saved scorer, memory-mapping its weight arrays."""
+        directory = Path(directory)
+        with open(directory / SCORER_FILE) as f:
+            params = json.load(f)
+        with open(directory / "vocabulary.json") as f:
+            vocabulary = json.load(f)
+
+        scorer = cls(
+            vocabulary=vocabulary,
+            idf=np.load(directory / "idf.npy", mmap_mode="r"),
+            folded=np.load(directory / FOLDED_FILE, mmap_mode="r"),
+            **params
+        )
+        return scorer
+
+    def _ngrams(self, text: str) -> List[str]:
+        """Tokenize and build n-grams exactly as the word analyzer does."""
+        if self.lowercase:
+            text = text.lower()
+        tokens = self._token_re.findall(text)
+
+        min_n, max_n = self.ngram_range
+        ngrams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            ngrams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return ngrams
+
+    def decision_function(self, texts: List[str]) -> np.ndarray:
+        """Logit of the scam class for each text."""
+        vocabulary = self.vocabulary
+        doc_ids, term_ids, counts = [], [], []
+
+        for doc_id, text in enumerate(texts):
+            term_counts = {}
+            for ngram in self._ngrams(text):
+                index = vocabulary.get(ngram)
+                if index is not None:
+                    term_counts[index] = term_counts.get(index, 0) + 1
+            doc_ids.extend([doc_id] * len(term_counts))
+            term_ids.extend(term_counts)
+            counts.extend(term_counts.values())
+
+        n_docs = len(texts)
+        doc_ids = np.asarray(doc_ids, dtype=np.intp)
+        term_ids = np.asarray(term_ids, dtype=np.intp)
+        tf = np.asarray(counts, dtype=np.float64)
+        if self.sublinear_tf:
+            tf = np.log(tf) + 1
+
+        dots = np.bincount(doc_ids, weights=tf * self.folded[term_ids], minlength=n_docs)
+        if self.norm == "l2":
+            weights = tf * self.idf[term_ids]
+            norms = np.sqrt(np.bincount(doc_ids, weights=weights * weights, minlength=n_docs))
+            norms[norms == 0.0] = 1.0
+            dots = dots / norms
+
+        return dots + self.intercept
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """Scam-class probability for each text."""
+        return 1.0 / (1.0 + np.exp(-self.decision_function(texts)))
+
+
+def verify_parity(scorer: CompiledScamScorer, vectorizer, model, texts: List[str],
+                  tolerance: float = PARITY_TOLERANCE) -> float:
+    """
+    Check the compiled scorer against sklearn on the given texts.
+
+    Returns:
+        The largest absolute probability difference
+
+    Raises:
+        ValueError if it exceeds the tolerance
+    """
+    texts = list(texts)
+    expected = model.predict_proba(vectorizer.transform(texts))[:, 1]
+    actual = scorer.predict_proba(texts)
+    max_diff = float(np.max(np.abs(expected - actual))) if texts else 0.0
+    if max_diff > tolerance:
+        raise ValueError(
+            f"Compiled scorer diverges from sklearn by {max_diff:.3g} (tolerance {tolerance:.0e})"
+        )
+    return max_diff
@@ -1,21 +1,36 @@
 """
 Enhanced Scam Classifier with improved pattern detection and confidence scoring.
 """
-import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
 import re
+import threading
+
+from ai_models.compiled_scorer import FOLDED_FILE, CompiledScamScorer, verify_parity
+from ai_models.keyword_matcher import KeywordMatcher
+from ai_models.model_store import DATASET_DIR, hash_files, load_text_model, store
+
+DATASET_PATH = DATASET_DIR / "enhanced_scam_texts.csv"
+FALLBACK_DATASET_PATH = DATASET_DIR / "scam_texts.csv"
 
 class EnhancedScamClassifier:
+    ARTIFACT_NAME = "enhanced_scam_classifier"
+    FEATURE_NAMES = (
+        'keyword_count', 'urgency_words', 'request_info',
+        'threat_words', 'has_numbers', 'length'
+    )
+    RISK_FACTORS = (
+        "Urgency language detected",
+        "Requesting sensitive information",
+        "Threatening language detected",
+        "Multiple scam keywords present"
+    )
+    
     def __init__(self):
-        self.vectorizer = TfidfVectorizer(
-            max_features=500,
-            ngram_range=(1, 3),
-            min_df=1
-        )
-        self.model = LogisticRegression(max_iter=1000, random_state=42)
+        # sklearn objects only exist after train(); inference uses the compiled scorer
+        self.vectorizer = None
+        self.model = None
+        self.scorer = None
+        self.scorer_max_diff = None
         self.scam_keywords = [
             'urgent', 'verify', 'suspended', 'frozen', 'immediately',
             'account', 'security', 'pin', 'password', 'ssn', 'social security',
@@ -26,56 +41,164 @@ class EnhancedScamClassifier:
             'grandson', 'emergency', 'trouble', 'help', 'money',
             'act now', 'limited time', 'expire', 'final notice'
         ]
+        self.urgency_words = ['urgent', 'immediately', 'now', 'asap']
+        self.request_info_words = ['pin', 'password', 'ssn', 'account', 'cvv']
+        self.threat_words = ['arrest', 'frozen', 'suspended', 'legal']
+        # Compiled once so feature extraction is a single pass per transcript
+        self.keyword_matcher = KeywordMatcher({
+            'keyword_count': self.scam_keywords,
+            'urgency_words': self.urgency_words,
+            'request_info': self.request_info_words,
+            'threat_words': self.threat_words
+        })
         self.trained = False
+        self.model_version = None
+        self.dataset_path = None
+        self.online_learner = None
+        self._train_lock = threading.Lock()
     
-    def train(self, csv_path="datasets/enhanced_scam_texts.csv"):
-        """Train the classifier on the dataset."""
+    def train(self, csv_path=DATASET_PATH):
+        """
+        Train the classifier on the dataset.
+
+        Raises:
+            ValueError if the compiled scorer disagrees with sklearn on the
+            training texts (nothing is swapped in)
+        """
+        import pandas as pd
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        
+        self.vectorizer = TfidfVectorizer(
+            max_features=500,
+            ngram_range=(1, 3),
+            min_df=1
+        )
+        self.model = LogisticRegression(max_iter=1000, random_state=42)
+        
         try:
             data = pd.read_csv(csv_path)
         except FileNotFoundError:
             # Fallback to original dataset
-            data = pd.read_csv("datasets/scam_texts.csv")
+            csv_path = FALLBACK_DATASET_PATH
+            data = pd.read_csv(csv_path)
         
         X = self.vectorizer.fit_transform(data["text"])
         y = data["label"]
         
         self.model.fit(X, y)
+        scorer = CompiledScamScorer.from_sklearn(self.vectorizer, self.model)
+        # Serving uses the compiled scorer only; refuse one that disagrees with sklearn
+        self.scorer_max_diff = verify_parity(scorer, self.vectorizer, self.model, data["text"])
+        self.scorer = scorer
+        self.dataset_path = csv_path
+        self.model_version = f"local-{hash_files(csv_path)[:8]}"
         self.trained = True
+        self._bind_online_learner()
         
         return len(data)
     
+    def load(self, model_store=store):
+        """
+        Load the published model artifacts instead of fitting.
+        Returns False when no version has been published.
+        """
+        version = model_store.current_version()
+        directory = model_store.artifact_dir(self.ARTIFACT_NAME, version)
+        if directory is None:
+            return False
+        
+        if (directory / FOLDED_FILE).exists():
+            self.scorer = CompiledScamScorer.load(directory)
+        else:
+            # Artifacts published before the compiled scorer existed
+            self.scorer = CompiledScamScorer.from_sklearn(*load_text_model(directory))
+        self.model_version = version
+        self.trained = True
+        self._bind_online_learner()
+        
+        return True
+    
+    def ensure_trained(self):
+        """
+        Load or train exactly once, even when the first requests arrive concurrently.
+        """
+        if self.trained:
+            return
+        with self._train_lock:
+            if not self.trained and not self.load():
+                self.train()
+    
+    def attach_online_learner(self, learner):
+        """Blend an online learner's probabilities into the ML score once it has absorbed feedback."""
+        self.online_learner = learner
+        self._bind_online_learner()
+    
+    def _bind_online_learner(self):
+        # The online model is only valid for the base model version it was built on
+        if self.online_learner is not None and self.scorer is not None:
+            self.online_learner.bind_base(self.model_version, self.scorer.predict_proba)
+    
+    @property
+    def serving_version(self):
+        """Version of the model actually producing predictions."""
+        learner = self.online_learner
+        if learner is not None and learner.serves(self.model_version):
+            return f"{self.model_version}+{learner.version}"
+        return self.model_version
+    
     def extract_features(self, text):
         """Extract additional features from text."""
-        text_lower = text.lower()
-        
-        features = {
-            'keyword_count': sum(1 for kw in self.scam_keywords if kw in text_lower),
-            'urgency_words': sum(1 for word in ['urgent', 'immediately', 'now', 'asap'] if word in text_lower),
-            'request_info': sum(1 for word in ['pin', 'password', 'ssn', 'account', 'cvv'] if word in text_lower),
-            'threat_words': sum(1 for word in ['arrest', 'frozen', 'suspended', 'legal'] if word in text_lower),
-            'has_numbers': 1 if re.search(r'\d', text) else 0,
-            'length': len(text.split())
-        }
+        features = self.keyword_matcher.count(text)
+        features['has_numbers'] = 1 if re.search(r'\d', text) else 0
+        features['length'] = len(text.split())
         
         return features
     
+    def extract_features_batch(self, texts):
+        """Extract additional features for a batch of texts as column arrays."""
+        rows = [self.extract_features(text) for text in texts]
+        return {
+            name: np.array([row[name] for row in rows], dtype=np.int64)
+            for name in self.FEATURE_NAMES
+        }
+    
     def predict_scam(self, text):
         """
         Predict scam probability with enhanced confidence scoring.
         Returns: (probability, confidence, risk_factors)
         """
-        if not self.trained:
-            self.train()
+        result = self.predict_scam_batch([text])
+        return result["probability"][0], result["confidence"][0], result["risk_factors"][0]
+    
+    def predict_scam_batch(self, texts):
+        """
+        Score a batch of transcripts with one vectorized pass of the compiled scorer.
+        Returns: dict of columns - probability, confidence (arrays),
+        risk_flags (boolean array per factor) and risk_factors (list per text)
+        """
+        self.ensure_trained()
+        
+        texts = list(texts)
+        if not texts:
+            return {
+                "probability": np.empty(0),
+                "confidence": np.empty(0),
+                "risk_flags": {factor: np.empty(0, dtype=bool) for factor in self.RISK_FACTORS},
+                "risk_factors": []
+            }
         
-        # Get ML model prediction
-        X_test = self.vectorizer.transform([text])
-        ml_prob = self.model.predict_proba(X_test)[0][1]
+        # Get ML model predictions for the whole batch
+        ml_prob = self.scorer.predict_proba(texts)
+        learner = self.online_learner
+        if learner is not None and learner.serves(self.model_version):
+            ml_prob = learner.blend(ml_prob, texts)
         
         # Extract additional features
-        features = self.extract_features(text)
+        features = self.extract_features_batch(texts)
         
         # Calculate feature-based score
-        feature_score = min(1.0, (
+        feature_score = np.minimum(1.0, (
             features['keyword_count'] * 0.05 +
             features['urgency_words'] * 0.15 +
             features['request_info'] * 0.20 +
@@ -86,23 +209,31 @@ class EnhancedScamClassifier:
         final_prob = (ml_prob * 0.7) + (feature_score * 0.3)
         
         # Calculate confidence based on feature strength
-        confidence = min(0.95, 0.5 + (features['keyword_count'] * 0.05))
+        confidence = np.minimum(0.95, 0.5 + (features['keyword_count'] * 0.05))
         
         # Identify risk factors
-        risk_factors = []
-        if features['urgency_words'] > 0:
-            risk_factors.append("Urgency language detected")
-        if features['request_info'] > 0:
-            risk_factors.append("Requesting sensitive information")
-        if features['threat_words'] > 0:
-            risk_factors.append("Threatening language detected")
-        if features['keyword_count'] >= 3:
-            risk_factors.append("Multiple scam keywords present")
-        
-        return final_prob, confidence, risk_factors
+        risk_flags = {
+            "Urgency language detected": features['urgency_words'] > 0,
+            "Requesting sensitive information": features['request_info'] > 0,
+            "Threatening language detected": features['threat_words'] > 0,
+            "Multiple scam keywords present": features['keyword_count'] >= 3
+        }
+        flag_matrix = np.column_stack([risk_flags[factor] for factor in self.RISK_FACTORS])
+        risk_factors = [
+            [factor for factor, flagged in zip(self.RISK_FACTORS, row) if flagged]
+            for row in flag_matrix
+        ]
+        
+        return {
+            "probability": final_prob,
+            "confidence": confidence,
+            "risk_flags": risk_flags,
+            "risk_factors": risk_factors
+        }
 
-# Global instance
+# Global instance - maps the published artifacts if any, else trains on first use
 classifier = EnhancedScamClassifier()
+classifier.load()
 
 def predict_scam(text):
     """Backward compatible function."""
@@ -112,3 +243,7 @@ def predict_scam(text):
 def predict_scam_detailed(text):
     """Enhanced function with detailed analysis."""
     return classifier.predict_scam(text)
+
+def predict_scam_batch(texts):
+    """Columnar batch analysis for bulk re-scoring."""
+    return classifier.predict_scam_batch(texts)
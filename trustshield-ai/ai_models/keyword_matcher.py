@@ -0,0 +1,58 @@
+"""
+Single-pass keyword matcher for transcript feature extraction.
+"""
+import re
+from typing import Dict, Iterable
+
+
+class KeywordMatcher:
+    """
+    Match every keyword category with one compiled regex pass.
+
+    Keywords match on word boundaries, so 'now' no longer fires inside
+    'know' or 'snow', and multi-word phrases tolerate any whitespace.
+    Counts are the number of distinct keywords of each category found.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        self.categories = tuple(categories)
+
+        # keyword -> categories it belongs to
+        self._keyword_categories = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                keyword = " ".join(keyword.lower().split())
+                self._keyword_categories.setdefault(keyword, []).append(category)
+
+        keywords = sorted(self._keyword_categories, key=len, reverse=True)
+
+        # Only the longest keyword is captured at each word start, so a phrase
+        # match also implies the shorter keywords it begins with
+        # (e.g. 'legal action' implies 'legal').
+        self._implied = {
+            keyword: tuple(
+                other for other in keywords
+                if other == keyword or keyword.startswith(other + " ")
+            )
+            for keyword in keywords
+        }
+
+        alternation = "|".join(
+            re.escape(keyword).replace(r"\ ", r"\s+") for keyword in keywords
+        )
+        self._pattern = re.compile(r"\b(?=(" + alternation + r")\b)", re.IGNORECASE)
+
+    def find(self, text: str) -> set:
+        """Return the set of distinct keywords present in text."""
+        found = set()
+        for match in self._pattern.finditer(text):
+            found.update(self._implied[" ".join(match.group(1).lower().split())])
+        return found
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Return the number of distinct keywords found per category."""
+        counts = dict.fromkeys(self.categories, 0)
+        for keyword in self.find(text):
+            for category in self._keyword_categories[keyword]:
+                counts[category] += 1
+        return counts
@@ -0,0 +1,234 @@
+"""
+Versioned model artifact store.
+
+Models are trained once offline and published as a versioned directory:
+
+    models/
+        CURRENT                      <- name of the version every worker serves
+        20260301120000-1a2b3c4d/
+            manifest.json            <- version, dataset hashes, library versions
+            enhanced_scam_classifier/
+                vocabulary.json, idf.npy, coef.npy, intercept.npy, classes.npy,
+                scorer.json, folded.npy   <- sklearn-free compiled scorer
+            scam_classifier/
+                ...
+            anomaly_detector/
+                isolation_forest.joblib, forest.npz   <- flattened forest for real-time scoring
+
+At startup the models map these arrays back in instead of refitting.
+
+Usage (from the trustshield-ai directory):
+    python -m ai_models.model_store train
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DATASET_DIR = BASE_DIR / "datasets"
+MODEL_DIR = Path(os.environ.get("TRUSTSHIELD_MODEL_DIR", BASE_DIR / "models"))
+
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+
+# Vectorizer settings that must round-trip for transform() to match training
+VECTORIZER_PARAMS = (
+    "lowercase", "token_pattern", "ngram_range", "analyzer",
+    "norm", "use_idf", "smooth_idf", "sublinear_tf"
+)
+
+
+def hash_files(*paths) -> str:
+    """SHA-256 over the contents of the given files, in order."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_array(array) -> str:
+    """SHA-256 over the raw bytes of an array (for in-code training data)."""
+    return hashlib.sha256(np.ascontiguousarray(array).tobytes()).hexdigest()
+
+
+def save_text_model(directory: Path, vectorizer, model) -> Dict:
+    """Save a fitted TF-IDF vectorizer and logistic model as plain arrays."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / "vocabulary.json", "w") as f:
+        json.dump({term: int(index) for term, index in vectorizer.vocabulary_.items()}, f)
+    np.save(directory / "idf.npy", vectorizer.idf_)
+    np.save(directory / "coef.npy", model.coef_)
+    np.save(directory / "intercept.npy", model.intercept_)
+    np.save(directory / "classes.npy", model.classes_)
+
+    params = {name: getattr(vectorizer, name) for name in VECTORIZER_PARAMS}
+    params["ngram_range"] = list(params["ngram_range"])
+    with open(directory / "vectorizer.json", "w") as f:
+        json.dump(params, f)
+
+    return {"features": len(vectorizer.vocabulary_)}
+
+
+def load_text_model(directory: Path):
+    """Rebuild a (vectorizer, model) pair from memory-mapped arrays."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    with open(directory / "vectorizer.json") as f:
+        params = json.load(f)
+    params["ngram_range"] = tuple(params["ngram_range"])
+    with open(directory / "vocabulary.json") as f:
+        vocabulary = json.load(f)
+
+    vectorizer = TfidfVectorizer(**params)
+    vectorizer.vocabulary_ = vocabulary
+    vectorizer.idf_ = np.load(directory / "idf.npy", mmap_mode="r")
+
+    model = LogisticRegression()
+    model.coef_ = np.load(directory / "coef.npy", mmap_mode="r")
+    model.intercept_ = np.load(directory / "intercept.npy")
+    model.classes_ = np.load(directory / "classes.npy")
+    model.n_features_in_ = model.coef_.shape[1]
+
+    return vectorizer, model
+
+
+def save_estimator(directory: Path, name: str, estimator) -> None:
+    """Save an arbitrary fitted estimator with joblib."""
+    import joblib
+
+    directory.mkdir(parents=True, exist_ok=True)
+    joblib.dump(estimator, directory / f"{name}.joblib")
+
+
+def load_estimator(directory: Path, name: str):
+    """Load an estimator saved with save_estimator, memory-mapping its arrays."""
+    import joblib
+
+    return joblib.load(directory / f"{name}.joblib", mmap_mode="r")
+
+
+class ModelStore:
+    """Resolves the published model version and its artifact directories."""
+
+    def __init__(self, root: Path = MODEL_DIR):
+        self.root = Path(root)
+
+    def current_version(self) -> Optional[str]:
+        """Version named by the CURRENT pointer, or None if nothing is published."""
+        try:
+            version = (self.root / CURRENT_FILE).read_text().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def artifact_dir(self, name: str, version: Optional[str] = None) -> Optional[Path]:
+        """Directory holding one model's artifacts for a version (default: CURRENT)."""
+        version = version or self.current_version()
+        if version is None:
+            return None
+        directory = self.root / version / name
+        return directory if directory.is_dir() else None
+
+    def manifest(self, version: Optional[str] = None) -> Optional[Dict]:
+        version = version or self.current_version()
+        if version is None:
+            return None
+        try:
+            with open(self.root / version / MANIFEST_FILE) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def publish(self, version: str) -> None:
+        """Atomically point CURRENT at a fully written version directory."""
+        tmp_path = self.root / f".{CURRENT_FILE}.{os.getpid()}"
+        tmp_path.write_text(version + "\n")
+        os.replace(tmp_path, self.root / CURRENT_FILE)
+
+
+# Global instance
+store = ModelStore()
+
+
+def train_all(root: Path = MODEL_DIR) -> Dict:
+    """
+    Fit every model from its dataset, write a new version and publish it.
+
+    Returns:
+        The manifest of the published version
+    """
+    import sklearn
+    from ai_models import anomaly_detector, scam_classifier
+    from ai_models.compiled_forest import CompiledIsolationForest, verify_forest_parity
+    from ai_models.enhanced_scam_classifier import EnhancedScamClassifier
+
+    target = ModelStore(root)
+    target.root.mkdir(parents=True, exist_ok=True)
+    staging = target.root / f".staging-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+
+    models = {}
+
+    enhanced = EnhancedScamClassifier()
+    enhanced.train()
+    models["enhanced_scam_classifier"] = save_text_model(
+        staging / "enhanced_scam_classifier", enhanced.vectorizer, enhanced.model
+    )
+    models["enhanced_scam_classifier"]["dataset_sha256"] = hash_files(enhanced.dataset_path)
+    # train() refuses a compiled scorer that disagrees with sklearn
+    models["enhanced_scam_classifier"]["scorer_max_diff"] = enhanced.scorer_max_diff
+    enhanced.scorer.save(staging / "enhanced_scam_classifier")
+
+    vectorizer, model = scam_classifier.train()
+    models["scam_classifier"] = save_text_model(staging / "scam_classifier", vectorizer, model)
+    models["scam_classifier"]["dataset_sha256"] = hash_files(scam_classifier.DATASET_PATH)
+
+    forest = anomaly_detector.train()
+    save_estimator(staging / "anomaly_detector", "isolation_forest", forest)
+    compiled_forest = CompiledIsolationForest.from_sklearn(forest)
+    # Refuse to publish a flattened forest whose scores differ from sklearn at all
+    verify_forest_parity(compiled_forest, forest, anomaly_detector.parity_probe())
+    compiled_forest.save(staging / "anomaly_detector")
+    models["anomaly_detector"] = {
+        "dataset_sha256": hash_array(anomaly_detector.TRAINING_TRANSACTIONS)
+    }
+
+    combined = hashlib.sha256(
+        "".join(m["dataset_sha256"] for m in models.values()).encode()
+    ).hexdigest()
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{combined[:8]}"
+
+    manifest = {
+        "version": version,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "dataset_sha256": combined,
+        "sklearn_version": sklearn.__version__,
+        "numpy_version": np.__version__,
+        "models": models
+    }
+    with open(staging / MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    os.replace(staging, target.root / version)
+    target.publish(version)
+
+    return manifest
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "train":
+        print("Usage: python -m ai_models.model_store train")
+        sys.exit(1)
+
+    published = train_all()
+    print(f"Published model version {published['version']} to {MODEL_DIR}")
@@ -0,0 +1,352 @@
+"""
+Online scam classifier that learns from analyst feedback.
+
+Labelled transcripts are buffered and folded into an SGD logistic model over a
+hashed n-gram space in small batches, so the cost of an update scales with
+the number of new labels rather than the corpus size.
+
+The online model never replaces the base classifier. It is bound to one base
+model version (bind_base) and its probability is blended into the base
+probability with a weight that grows with the number of labels absorbed, so
+a single verdict barely moves scores. After every batch the candidate blend
+is checked on a held-out calibration split of the bootstrap dataset and only
+served if it is not worse than the base model alone. When a new base version
+is published, the online model is discarded and rebuilt from the stored
+feedback. The learner periodically snapshots itself to disk with an atomic
+rename, and right away whenever the served model changes, so worker
+processes can pick it up with refresh().
+"""
+import copy
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from ai_models.model_store import DATASET_DIR, MODEL_DIR
+
+SNAPSHOT_DIR = MODEL_DIR / "online"
+BOOTSTRAP_DATASET_PATH = DATASET_DIR / "enhanced_scam_texts.csv"
+
+
+class OnlineScamLearner:
+    """
+    Args:
+        n_features: Size of the hashed n-gram space
+        batch_size: Verdicts buffered before they are folded in
+        snapshot_interval: Minimum seconds between snapshots
+        snapshot_dir: Where snapshots are written
+        prior_weight: Labels at which the online model gets half of max_weight;
+            the blend weight is max_weight * n / (n + prior_weight)
+        max_weight: Largest share of the probability taken from the online model
+        calibration_share: Share of the bootstrap dataset held out for the
+            calibration check
+        calibration_tolerance: Brier score increase over the base model that
+            is still accepted
+        history_size: Verdicts kept to rebuild the model on a new base version
+    """
+
+    def __init__(self,
+                 n_features: int = 2 ** 18,
+                 batch_size: int = 16,
+                 snapshot_interval: float = 300.0,
+                 snapshot_dir: Path = SNAPSHOT_DIR,
+                 prior_weight: float = 200.0,
+                 max_weight: float = 0.5,
+                 calibration_share: float = 0.25,
+                 calibration_tolerance: float = 0.02,
+                 history_size: int = 10000):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        # Stateless, so no vocabulary has to be refit as new phrasing arrives
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, 3),
+            alternate_sign=False,
+            norm="l2"
+        )
+        self.batch_size = batch_size
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_dir = Path(snapshot_dir)
+        self.prior_weight = prior_weight
+        self.max_weight = max_weight
+        self.calibration_share = calibration_share
+        self.calibration_tolerance = calibration_tolerance
+
+        self._model = None          # model being trained (guarded by _lock)
+        # (frozen model, blend weight) used for predictions, replaced as a whole
+        self._serving = None
+        self._pending: List = []
+        self._history = deque(maxlen=history_size)   # verdicts folded into _model
+        self._lock = threading.Lock()
+        self._last_snapshot = time.time()
+        self._loaded_mtime: Optional[float] = None
+
+        # Base classifier the online model is blended into
+        self.base_version: Optional[str] = None
+        self._base_predict: Optional[Callable] = None
+        self._calibration = None    # held-out (texts, labels)
+
+        self.updates = 0
+        self.feedback_count = 0
+        self.rejected = 0
+        self.last_check: Optional[Dict] = None
+        self.version: Optional[str] = None
+
+    @property
+    def serving(self):
+        """Frozen online model currently blended into predictions, if any."""
+        serving = self._serving
+        return serving[0] if serving is not None else None
+
+    def _new_model(self):
+        from sklearn.linear_model import SGDClassifier
+
+        return SGDClassifier(loss="log_loss", alpha=1e-4, random_state=42)
+
+    def _split_bootstrap(self, csv_path: Path = BOOTSTRAP_DATASET_PATH):
+        """Deterministic (training, calibration) split of the curated dataset."""
+        import pandas as pd
+        from sklearn.model_selection import train_test_split
+
+        data = pd.read_csv(csv_path)
+        train, calibration = train_test_split(
+            data, test_size=self.calibration_share, stratify=data["label"], random_state=42
+        )
+        return train, calibration
+
+    def _bootstrap(self, epochs: int = 5) -> None:
+        """Seed the model from the curated dataset before the first feedback batch."""
+        train, calibration = self._split_bootstrap()
+        self._calibration = (list(calibration["text"]), calibration["label"].to_numpy())
+        X = self.vectorizer.transform(train["text"])
+        y = train["label"].to_numpy()
+
+        self._model = self._new_model()
+        for _ in range(epochs):
+            self._model.partial_fit(X, y, classes=np.array([0, 1]))
+
+    def bind_base(self, version: str, predict_proba: Callable) -> None:
+        """
+        Blend into this base model. Online state built on a different base
+        version is discarded; its stored verdicts are folded in again on the
+        next flush.
+        """
+        with self._lock:
+            self._base_predict = predict_proba
+            if version == self.base_version:
+                return
+            if self._model is not None:
+                print(f"Discarding online model built on base version {self.base_version}")
+            self._model = None
+            self._serving = None
+            self._pending = list(self._history) + self._pending
+            self._history.clear()
+            self.base_version = version
+
+    def serves(self, base_version: Optional[str]) -> bool:
+        """Whether predictions for this base version get an online blend."""
+        return self._serving is not None and base_version == self.base_version
+
+    def blend_weight(self, labels: int) -> float:
+        return self.max_weight * labels / (labels + self.prior_weight)
+
+    def add_feedback(self, transcript: str, label: int) -> Dict:
+        """Queue one analyst verdict (1 = scam, 0 = legitimate)."""
+        if label not in (0, 1):
+            raise ValueError("label must be 0 (legitimate) or 1 (scam)")
+
+        with self._lock:
+            self._pending.append((transcript, label))
+            self.feedback_count += 1
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+
+        return self.stats()
+
+    def flush(self) -> Dict:
+        """Fold any pending feedback into the model now."""
+        with self._lock:
+            self._flush_locked()
+        return self.stats()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        if self._model is None:
+            self._bootstrap()
+
+        texts, labels = zip(*self._pending)
+        self._history.extend(self._pending)
+        self._pending = []
+
+        self._model.partial_fit(self.vectorizer.transform(texts), np.array(labels))
+        self.updates += 1
+        self.version = f"online-{self.updates}"
+
+        # Workers serve from the snapshot, so a newly served model is written at once
+        if self._promote_locked() or time.time() - self._last_snapshot >= self.snapshot_interval:
+            self._snapshot_locked()
+
+    def _promote_locked(self) -> bool:
+        """Serve the updated model only if the blend stays calibrated on held-out data."""
+        if self._base_predict is None:
+            print("Online model not served: no base model bound")
+            return False
+        if self._calibration is None:
+            _, calibration = self._split_bootstrap()
+            self._calibration = (list(calibration["text"]), calibration["label"].to_numpy())
+
+        texts, labels = self._calibration
+        weight = self.blend_weight(len(self._history))
+        base = np.asarray(self._base_predict(texts))
+        online = self._model.predict_proba(self.vectorizer.transform(texts))[:, 1]
+        blended = (1.0 - weight) * base + weight * online
+
+        base_brier = float(np.mean((base - labels) ** 2))
+        blended_brier = float(np.mean((blended - labels) ** 2))
+        accepted = blended_brier <= base_brier + self.calibration_tolerance
+        self.last_check = {
+            "version": self.version,
+            "weight": round(weight, 4),
+            "base_brier": round(base_brier, 4),
+            "blended_brier": round(blended_brier, 4),
+            "accepted": accepted
+        }
+        if not accepted:
+            self.rejected += 1
+            print(f"Online model {self.version} rejected by calibration check: {self.last_check}")
+            return False
+
+        # Readers keep using the old copy until this single reference swap
+        self._serving = (copy.deepcopy(self._model), weight)
+        return True
+
+    def blend(self, base_prob: np.ndarray, texts: List[str]) -> np.ndarray:
+        """Base probabilities blended with the serving online model."""
+        serving = self._serving
+        if serving is None:
+            return base_prob
+        model, weight = serving
+        online = model.predict_proba(self.vectorizer.transform(texts))[:, 1]
+        return (1.0 - weight) * base_prob + weight * online
+
+    def predict_proba(self, texts: List[str]) -> np.ndarray:
+        """Scam-class probability from the serving online model alone."""
+        model = self.serving
+        if model is None:
+            raise RuntimeError("Online model has not absorbed any feedback yet")
+        return model.predict_proba(self.vectorizer.transform(texts))[:, 1]
+
+    def snapshot(self) -> Optional[Path]:
+        """Persist the current model to disk."""
+        with self._lock:
+            return self._snapshot_locked()
+
+    def _snapshot_locked(self) -> Optional[Path]:
+        import joblib
+
+        if self._model is None:
+            return None
+
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        path = self.snapshot_dir / "learner.joblib"
+        tmp_path = self.snapshot_dir / f".learner.joblib.{os.getpid()}"
+        joblib.dump(self._model, tmp_path)
+        os.replace(tmp_path, path)
+
+        serving_path = self.snapshot_dir / "serving.joblib"
+        if self._serving is not None:
+            tmp_path = self.snapshot_dir / f".serving.joblib.{os.getpid()}"
+            joblib.dump(self._serving[0], tmp_path)
+            os.replace(tmp_path, serving_path)
+        elif serving_path.exists():
+            serving_path.unlink()
+
+        meta_tmp = self.snapshot_dir / f".meta.json.{os.getpid()}"
+        meta_tmp.write_text(json.dumps({
+            "version": self.version,
+            "base_version": self.base_version,
+            "serving_weight": self._serving[1] if self._serving is not None else None,
+            "updates": self.updates,
+            "feedback_count": self.feedback_count,
+            "rejected": self.rejected,
+            "n_features": self.vectorizer.n_features,
+            "history": list(self._history),
+            "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+        }))
+        os.replace(meta_tmp, self.snapshot_dir / "meta.json")
+
+        self._last_snapshot = time.time()
+        self._loaded_mtime = (self.snapshot_dir / "meta.json").stat().st_mtime
+        return path
+
+    def load(self) -> bool:
+        """Resume from the last snapshot; returns False if there is none."""
+        import joblib
+
+        try:
+            mtime = (self.snapshot_dir / "meta.json").stat().st_mtime
+            meta = json.loads((self.snapshot_dir / "meta.json").read_text())
+            model = joblib.load(self.snapshot_dir / "learner.joblib")
+        except FileNotFoundError:
+            return False
+        if meta.get("n_features") != self.vectorizer.n_features:
+            print("Ignoring online learner snapshot with a different feature space")
+            return False
+        if "base_version" not in meta:
+            print("Ignoring online learner snapshot without a base model version")
+            return False
+
+        serving = None
+        if meta.get("serving_weight") is not None:
+            serving = (joblib.load(self.snapshot_dir / "serving.joblib"), meta["serving_weight"])
+
+        with self._lock:
+            self._model = model
+            self._serving = serving
+            self._history.clear()
+            self._history.extend(tuple(item) for item in meta["history"])
+            self.base_version = meta["base_version"]
+            self.updates = meta["updates"]
+            self.feedback_count = meta["feedback_count"]
+            self.rejected = meta.get("rejected", 0)
+            self.version = meta["version"]
+            self._loaded_mtime = mtime
+        return True
+
+    def refresh(self) -> bool:
+        """
+        Reload the snapshot if another process has written a newer one
+        (worker processes serve the model the API process trains).
+        Returns True if it was reloaded.
+        """
+        try:
+            mtime = (self.snapshot_dir / "meta.json").stat().st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._loaded_mtime:
+            return False
+        return self.load()
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "updates": self.updates,
+            "feedback_count": self.feedback_count,
+            "pending": len(self._pending),
+            "serving": self.serving is not None,
+            "base_version": self.base_version,
+            "serving_weight": self._serving[1] if self._serving is not None else None,
+            "rejected": self.rejected,
+            "last_check": self.last_check
+        }
+
+
+# Global instance - resumes from the last snapshot if one exists
+learner = OnlineScamLearner()
+learner.load()
@@ -0,0 +1,262 @@
+"""
+In-memory caller and account reputation for the behavioural risk factors.
+
+Three lookups feed calculate_detailed_risk:
+
+    repeat_caller           the number has called repeatedly within a recent window
+    known_scammer_pattern   the number is on the known scam list
+    verified_customer       the account has a confirmed legitimate interaction
+
+Recent calls are a hash map of caller -> (window start, calls in window) with
+least-recently-used eviction. Known scam numbers live in a Bloom filter (a
+fixed NumPy bit array), so millions of numbers fit in a few MB at the cost of
+a small, configurable false-positive rate. Verified accounts are a set.
+
+The index is loaded from a snapshot at startup and updated from confirmed
+analyst verdicts; it snapshots itself to disk with an atomic rename.
+
+    TRUSTSHIELD_REPUTATION_CAPACITY     callers kept in memory (default: 1000000)
+    TRUSTSHIELD_SCAM_NUMBERS_CAPACITY   scam numbers the Bloom filter is sized for
+                                        (default: 1000000)
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from ai_models.model_store import MODEL_DIR
+
+SNAPSHOT_DIR = MODEL_DIR / "reputation"
+SNAPSHOT_FILE = "reputation.npz"
+
+DEFAULT_CAPACITY = int(os.environ.get("TRUSTSHIELD_REPUTATION_CAPACITY", "1000000"))
+DEFAULT_SCAM_CAPACITY = int(os.environ.get("TRUSTSHIELD_SCAM_NUMBERS_CAPACITY", "1000000"))
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_caller_id(caller_id: str) -> str:
+    """Digits only, so "+1 (555) 010-0000" and "15550100000" are the same number."""
+    return _NON_DIGITS.sub("", str(caller_id))
+
+
+class BloomFilter:
+    """
+    Bit-array Bloom filter with double hashing over one blake2b digest.
+
+    Args:
+        capacity: Expected number of items
+        error_rate: Target false-positive rate at capacity
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 1e-4):
+        n_bits = int(np.ceil(-capacity * np.log(error_rate) / np.log(2) ** 2))
+        self.n_bits = max(8, n_bits)
+        self.n_hashes = max(1, int(round(self.n_bits / max(capacity, 1) * np.log(2))))
+        self.bits = np.zeros((self.n_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.n_hashes):
+            yield (h1 + i * h2) % self.n_bits
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        # memoryview indexing yields plain ints, much cheaper than NumPy scalars
+        bits = memoryview(self.bits)
+        # Stops at the first clear bit, so most unknown numbers cost one or two probes
+        for position in self._positions(item):
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+
+class ReputationIndex:
+    """
+    Caller and account reputation answering the behavioural risk lookups.
+
+    Args:
+        capacity: Maximum number of callers tracked; the least recently seen is evicted
+        scam_capacity: Number of known scam numbers the Bloom filter is sized for
+        error_rate: Bloom filter false-positive rate at scam_capacity
+        repeat_calls: Calls within repeat_window (including the current one)
+            that make a repeat caller
+        repeat_window: Seconds over which calls are counted
+        snapshot_interval: Minimum seconds between snapshots written after verdicts
+        snapshot_dir: Where snapshots are written
+    """
+
+    def __init__(self,
+                 capacity: int = DEFAULT_CAPACITY,
+                 scam_capacity: int = DEFAULT_SCAM_CAPACITY,
+                 error_rate: float = 1e-4,
+                 repeat_calls: int = 3,
+                 repeat_window: float = 7 * 86400.0,
+                 snapshot_interval: float = 300.0,
+                 snapshot_dir: Path = SNAPSHOT_DIR):
+        self.capacity = capacity
+        self.repeat_calls = repeat_calls
+        self.repeat_window = repeat_window
+        self.snapshot_interval = snapshot_interval
+        self.snapshot_dir = Path(snapshot_dir)
+
+        self._callers: "OrderedDict[str, tuple]" = OrderedDict()   # caller -> (window start, calls)
+        self.scam_numbers = BloomFilter(scam_capacity, error_rate)
+        self.verified_accounts = set()
+        self._lock = threading.Lock()
+        self._last_snapshot = time.time()
+
+        self.verdicts = 0
+        self.evictions = 0
+
+    def _recent_calls(self, caller: str, now: float) -> int:
+        record = self._callers.get(caller)
+        if record is None or now - record[0] > self.repeat_window:
+            return 0
+        return record[1]
+
+    def behavioral_factors(self,
+                           caller_id: Optional[str] = None,
+                           account_id: Optional[str] = None,
+                           now: Optional[float] = None) -> Dict[str, bool]:
+        """
+        Behavioural flags for calculate_detailed_risk. Read-only; call
+        record_call afterwards to count the call itself.
+        """
+        now = time.time() if now is None else now
+        caller = normalize_caller_id(caller_id) if caller_id else ""
+        return {
+            "repeat_caller": bool(caller) and self._recent_calls(caller, now) + 1 >= self.repeat_calls,
+            "known_scammer_pattern": bool(caller) and caller in self.scam_numbers,
+            "verified_customer": account_id is not None and account_id in self.verified_accounts
+        }
+
+    def record_call(self, caller_id: str, now: Optional[float] = None) -> None:
+        """Count one call from a number."""
+        caller = normalize_caller_id(caller_id)
+        if not caller:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            record = self._callers.get(caller)
+            if record is None or now - record[0] > self.repeat_window:
+                record = (now, 0)
+            self._callers[caller] = (record[0], record[1] + 1)
+            self._callers.move_to_end(caller)
+            if len(self._callers) > self.capacity:
+                self._callers.popitem(last=False)
+                self.evictions += 1
+
+    def add_scam_numbers(self, caller_ids: Iterable[str]) -> None:
+        """Add numbers to the known scam list (e.g. from a fraud-intelligence feed)."""
+        with self._lock:
+            for caller_id in caller_ids:
+                caller = normalize_caller_id(caller_id)
+                if caller and caller not in self.scam_numbers:
+                    self.scam_numbers.add(caller)
+
+    def record_verdict(self, label: int,
+                       caller_id: Optional[str] = None,
+                       account_id: Optional[str] = None) -> Dict:
+        """
+        Fold in a confirmed verdict: a scam (1) puts the caller on the known
+        scam list, a legitimate call (0) marks the account as verified.
+        """
+        if label not in (0, 1):
+            raise ValueError("label must be 0 (legitimate) or 1 (scam)")
+
+        with self._lock:
+            caller = normalize_caller_id(caller_id) if caller_id else ""
+            if label == 1 and caller and caller not in self.scam_numbers:
+                self.scam_numbers.add(caller)
+            elif label == 0 and account_id is not None:
+                self.verified_accounts.add(account_id)
+            self.verdicts += 1
+
+            if time.time() - self._last_snapshot >= self.snapshot_interval:
+                self._snapshot_locked()
+
+        return self.stats()
+
+    def snapshot(self) -> Path:
+        """Persist the index to disk."""
+        with self._lock:
+            return self._snapshot_locked()
+
+    def _snapshot_locked(self) -> Path:
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        path = self.snapshot_dir / SNAPSHOT_FILE
+        tmp_path = self.snapshot_dir / f".{SNAPSHOT_FILE}.{os.getpid()}"
+
+        callers = list(self._callers.items())
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                caller_ids=np.array([caller for caller, _ in callers], dtype=str),
+                window_start=np.array([record[0] for _, record in callers], dtype=np.float64),
+                calls=np.array([record[1] for _, record in callers], dtype=np.int64),
+                verified_accounts=np.array(sorted(self.verified_accounts), dtype=str),
+                bloom_bits=self.scam_numbers.bits,
+                bloom_hashes=self.scam_numbers.n_hashes,
+                bloom_count=self.scam_numbers.count,
+                verdicts=self.verdicts
+            )
+        os.replace(tmp_path, path)
+
+        self._last_snapshot = time.time()
+        return path
+
+    def load(self) -> bool:
+        """Resume from the last snapshot; returns False if there is none."""
+        try:
+            snapshot = np.load(self.snapshot_dir / SNAPSHOT_FILE)
+        except FileNotFoundError:
+            return False
+
+        with snapshot:
+            if (len(snapshot["bloom_bits"]) != len(self.scam_numbers.bits)
+                    or int(snapshot["bloom_hashes"]) != self.scam_numbers.n_hashes):
+                print("Ignoring reputation snapshot with a different Bloom filter size")
+                return False
+
+            callers = OrderedDict(
+                (str(caller), (float(start), int(calls)))
+                for caller, start, calls in zip(
+                    snapshot["caller_ids"], snapshot["window_start"], snapshot["calls"])
+            )
+            with self._lock:
+                self._callers = callers
+                self.scam_numbers.bits = snapshot["bloom_bits"].copy()
+                self.scam_numbers.count = int(snapshot["bloom_count"])
+                self.verified_accounts = set(str(account) for account in snapshot["verified_accounts"])
+                self.verdicts = int(snapshot["verdicts"])
+        return True
+
+    def stats(self) -> Dict:
+        return {
+            "callers": len(self._callers),
+            "capacity": self.capacity,
+            "scam_numbers": self.scam_numbers.count,
+            "verified_accounts": len(self.verified_accounts),
+            "verdicts": self.verdicts,
+            "evictions": self.evictions,
+            "bloom_memory_mb": round(self.scam_numbers.bits.nbytes / (1024 * 1024), 2)
+        }
+
+
+# Global instance - resumes from the last snapshot if one exists
+reputation = ReputationIndex()
+reputation.load()
@@ -2,17 +2,41 @@ import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 
-data = pd.read_csv("datasets/scam_texts.csv")
+from ai_models.model_store import DATASET_DIR, hash_files, load_text_model, store
 
-vectorizer = TfidfVectorizer()
+ARTIFACT_NAME = "scam_classifier"
+DATASET_PATH = DATASET_DIR / "scam_texts.csv"
 
-X = vectorizer.fit_transform(data["text"])
+def train(csv_path=DATASET_PATH):
 
-y = data["label"]
+    data = pd.read_csv(csv_path)
 
-model = LogisticRegression()
+    vectorizer = TfidfVectorizer()
 
-model.fit(X, y)
+    X = vectorizer.fit_transform(data["text"])
+
+    y = data["label"]
+
+    model = LogisticRegression()
+
+    model.fit(X, y)
+
+    return vectorizer, model
+
+def load():
+    # Serve the published artifacts; fit in-process only if none exist
+    version = store.current_version()
+    directory = store.artifact_dir(ARTIFACT_NAME, version)
+
+    if directory is None:
+        vectorizer, model = train()
+        return vectorizer, model, f"local-{hash_files(DATASET_PATH)[:8]}"
+
+    vectorizer, model = load_text_model(directory)
+
+    return vectorizer, model, version
+
+vectorizer, model, model_version = load()
 
 def predict_scam(text):
 
@@ -20,4 +44,4 @@ def predict_scam(text):
 
     prob = model.predict_proba(X_test)[0][1]
 
-    return prob
\ No newline at end of file
+    return prob
@@ -1,9 +1,230 @@
-import whisper
+"""
+Speech-to-text with a lazily loaded, pooled Whisper model manager.
+Which engine actually transcribes is chosen in ai_models.stt_backends.
 
-model = whisper.load_model("base")
+The model size and number of pooled instances come from the environment so a
+deployment can trade accuracy for throughput without code changes:
+
+    TRUSTSHIELD_WHISPER_MODEL       tiny | base | small   (default: base)
+    TRUSTSHIELD_WHISPER_POOL_SIZE   instances to keep loaded (default: 1)
+    TRUSTSHIELD_TRANSCRIBE_WORKERS  processes for long recordings (default: the CPU
+                                    count divided between the processes that
+                                    transcribe concurrently, see share_cpus)
+"""
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+WHISPER_MODEL_SIZES = ("tiny", "base", "small")
+DEFAULT_MODEL_SIZE = os.environ.get("TRUSTSHIELD_WHISPER_MODEL", "base")
+DEFAULT_POOL_SIZE = int(os.environ.get("TRUSTSHIELD_WHISPER_POOL_SIZE", "1"))
+_TRANSCRIBE_WORKERS = os.environ.get("TRUSTSHIELD_TRANSCRIBE_WORKERS")
+
+
+class SpeechModelManager:
+    """
+    Pool of Whisper model instances.
+
+    Instances are loaded on first use (or by load()), and each one is handed
+    to a single caller at a time, so a model is never used by two threads at
+    once.
+    """
+
+    def __init__(self, model_size: str = DEFAULT_MODEL_SIZE, pool_size: int = DEFAULT_POOL_SIZE):
+        if model_size not in WHISPER_MODEL_SIZES:
+            raise ValueError(
+                f"Unknown Whisper model size '{model_size}'. Allowed: {', '.join(WHISPER_MODEL_SIZES)}"
+            )
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+        self.model_size = model_size
+        self.pool_size = pool_size
+        self._idle = queue.Queue()
+        self._load_lock = threading.Lock()
+        self._loaded = 0
+        self.load_seconds = []
+        self.model_bytes = 0
+
+    def _load_instance(self):
+        import whisper
+
+        start = time.perf_counter()
+        model = whisper.load_model(self.model_size)
+        self.load_seconds.append(time.perf_counter() - start)
+
+        tensors = list(model.parameters()) + list(model.buffers())
+        self.model_bytes = sum(t.numel() * t.element_size() for t in tensors)
+        self._loaded += 1
+        return model
+
+    def load(self) -> None:
+        """Load every pooled instance now (used by the startup warm-up)."""
+        with self._load_lock:
+            while self._loaded < self.pool_size:
+                self._idle.put(self._load_instance())
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """Borrow one model instance exclusively for the duration of the block."""
+        try:
+            model = self._idle.get_nowait()
+        except queue.Empty:
+            model = None
+            with self._load_lock:
+                if self._loaded < self.pool_size:
+                    model = self._load_instance()
+            if model is None:
+                model = self._idle.get(timeout=timeout)
+
+        try:
+            yield model
+        finally:
+            self._idle.put(model)
+
+    def transcribe(self, audio, **kwargs) -> Dict:
+        """Run Whisper on a file path or 16 kHz float32 waveform."""
+        with self.acquire() as model:
+            return model.transcribe(audio, **kwargs)
+
+    def stats(self) -> Dict:
+        return {
+            "model_size": self.model_size,
+            "pool_size": self.pool_size,
+            "loaded_instances": self._loaded,
+            "in_use": self._loaded - self._idle.qsize(),
+            "load_seconds": [round(seconds, 3) for seconds in self.load_seconds],
+            "model_memory_mb": round(self.model_bytes / (1024 * 1024), 1),
+            "total_memory_mb": round(self.model_bytes * self._loaded / (1024 * 1024), 1)
+        }
+
+
+# Global instance - nothing is loaded until first use or warm_up()
+manager = SpeechModelManager()
+
+def load_audio(file_path):
+    # Decode any supported format to 16 kHz mono float32 (needs ffmpeg on PATH)
+    from whisper.audio import load_audio as whisper_load_audio
+
+    return whisper_load_audio(str(file_path), sr=SAMPLE_RATE)
+
+def transcribe_result(audio, backend: Optional[str] = None):
+    """Transcribe with the configured backend; returns a TranscriptionResult."""
+    from ai_models.stt_backends import get_backend
+
+    return get_backend(backend).transcribe(audio)
 
 def transcribe_audio(file_path):
 
-    result = model.transcribe(file_path)
+    result = transcribe_result(file_path)
+
+    return result.text
+
+_chunk_executor: Optional[ProcessPoolExecutor] = None
+_chunk_executor_workers = 0
+_chunk_executor_lock = threading.Lock()
+# Processes transcribing concurrently on this machine (this one included)
+_cpu_sharers = 1
+
+def share_cpus(processes: int) -> None:
+    """
+    Declare how many processes transcribe concurrently, e.g. the workers of
+    an outer process pool, so each one's chunk pool gets its share of the
+    cores instead of all of them (every chunk worker loads its own model).
+    """
+    global _cpu_sharers
+    _cpu_sharers = max(1, processes)
+
+def default_transcribe_workers() -> int:
+    """Chunk workers per transcribing process."""
+    if _TRANSCRIBE_WORKERS:
+        return max(1, int(_TRANSCRIBE_WORKERS))
+    return max(1, (os.cpu_count() or 1) // _cpu_sharers)
+
+def _init_chunk_worker(threads_per_worker):
+    # Split the cores between workers instead of every process using all of them
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+def _transcribe_chunk(backend, pcm):
+    return transcribe_result(pcm, backend)
+
+def _submit_chunks(workers, backend, chunks):
+    """Submit chunks to the shared chunk pool, resizing it to `workers` if needed."""
+    global _chunk_executor, _chunk_executor_workers
+    # Submitting under the lock means a resize never shuts down a pool
+    # another call is about to submit to; already submitted chunks still run
+    with _chunk_executor_lock:
+        if _chunk_executor is None or _chunk_executor_workers != workers:
+            if _chunk_executor is not None:
+                _chunk_executor.shutdown(wait=False)
+            _chunk_executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_chunk_worker,
+                initargs=(max(1, (os.cpu_count() or 1) // (workers * _cpu_sharers)),)
+            )
+            _chunk_executor_workers = workers
+        return [_chunk_executor.submit(_transcribe_chunk, backend, chunk) for chunk in chunks]
+
+def transcribe_audio_parallel(audio, workers=None, target_chunk_seconds=60.0,
+                              backend: Optional[str] = None):
+    """
+    Transcribe a long recording by splitting it at silences and decoding the
+    chunks in parallel worker processes; the text is stitched back in order.
+    With a single worker the chunks are decoded in this process, reusing its
+    loaded model. Returns a TranscriptionResult with segments on the
+    recording's timeline.
+
+    Args:
+        workers: Chunk worker processes (default: default_transcribe_workers())
+    """
+    from ai_models.audio_processing import split_at_silence, stitch_transcripts
+    from ai_models.stt_backends import TranscriptionResult, get_backend
+
+    backend = get_backend(backend).name
+    pcm = load_audio(audio) if isinstance(audio, (str, os.PathLike)) else audio
+    chunks = split_at_silence(pcm, target_seconds=target_chunk_seconds)
+    if len(chunks) == 1:
+        return transcribe_result(pcm, backend)
+
+    workers = workers or default_transcribe_workers()
+    pieces = [pcm[start:end] for start, end in chunks]
+    if workers <= 1:
+        results = [transcribe_result(piece, backend) for piece in pieces]
+    else:
+        results = [future.result() for future in _submit_chunks(workers, backend, pieces)]
+
+    segments = []
+    for i, ((start, _), result) in enumerate(zip(chunks, results)):
+        offset = start / SAMPLE_RATE
+        # The overlap before each cut was already covered by the previous chunk
+        cut = chunks[i - 1][1] / SAMPLE_RATE if i else 0.0
+        for segment in result.segments:
+            segment = dict(segment, start=round(segment["start"] + offset, 2),
+                           end=round(segment["end"] + offset, 2))
+            if (segment["start"] + segment["end"]) / 2 >= cut:
+                segments.append(segment)
+
+    lengths = [end - start for start, end in chunks]
+    return TranscriptionResult(
+        text=stitch_transcripts([result.text for result in results]),
+        segments=segments,
+        confidence=round(float(np.average([r.confidence for r in results], weights=lengths)), 4)
+    )
+
+def warm_up():
+    from ai_models.stt_backends import get_backend
 
-    return result["text"]
\ No newline at end of file
+    get_backend().warm_up()
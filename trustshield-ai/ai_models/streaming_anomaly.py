@@ -0,0 +1,254 @@
+"""
+Streaming transaction anomaly detector (Half-Space Trees).
+
+An ensemble of random half-space trees is built once over the feature space,
+without looking at data. Each node counts how many transactions fell into its
+region in two alternating windows: the reference window (used for scoring)
+and the latest window (being filled). After every `window_size` observed
+transactions the latest counts become the new reference, so the model tracks
+shifting fraud patterns at O(trees x depth) cost per transaction and never
+needs a refit over history.
+
+Scoring only reads an immutable (reference, threshold, window id) snapshot
+that is replaced by a single assignment, so refreshes never block scoring.
+
+    TRUSTSHIELD_HST_WINDOW   transactions per reference window (default: 256)
+
+Tan, Ting & Liu, "Fast Anomaly Detection for Streaming Data", IJCAI 2011.
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_WINDOW = int(os.environ.get("TRUSTSHIELD_HST_WINDOW", "256"))
+
+N_FEATURES = 3
+MAX_LOG_AMOUNT = 8.0    # $100M
+MAX_FREQUENCY = 20.0
+
+
+def transaction_features(amount: float, frequency: float, is_international: int) -> np.ndarray:
+    """Scale [amount, frequency, is_international] into the unit cube."""
+    return np.array([
+        min(np.log10(1.0 + max(amount, 0.0)) / MAX_LOG_AMOUNT, 1.0),
+        min(max(frequency, 0.0) / MAX_FREQUENCY, 1.0),
+        1.0 if is_international else 0.0
+    ])
+
+
+def transaction_features_batch(transactions: np.ndarray) -> np.ndarray:
+    """transaction_features for every row of an (n, 3) array."""
+    amounts, frequencies, international = np.asarray(transactions, dtype=np.float64).T
+    return np.column_stack((
+        np.minimum(np.log10(1.0 + np.maximum(amounts, 0.0)) / MAX_LOG_AMOUNT, 1.0),
+        np.minimum(np.maximum(frequencies, 0.0) / MAX_FREQUENCY, 1.0),
+        (international != 0).astype(np.float64)
+    ))
+
+
+class HalfSpaceTrees:
+    """
+    Args:
+        n_trees: Trees in the ensemble
+        depth: Depth of every (full binary) tree
+        window_size: Observations per reference window
+        contamination: Share of a window's observations that score as anomalous
+        drift_depth: Tree level whose mass distribution is compared between
+            consecutive windows to measure drift
+        seed: Random seed for the tree structure
+    """
+
+    def __init__(self,
+                 n_trees: int = 25,
+                 depth: int = 10,
+                 window_size: int = DEFAULT_WINDOW,
+                 contamination: float = 0.05,
+                 drift_depth: int = 4,
+                 seed: int = 42):
+        self.n_trees = n_trees
+        self.depth = depth
+        self.window_size = window_size
+        self.contamination = contamination
+        self.drift_depth = min(drift_depth, depth)
+        # Regions holding less mass than this are not split further when scoring
+        self.size_limit = 0.1 * window_size
+
+        self._build_trees(np.random.default_rng(seed))
+        self._trees = np.arange(n_trees)
+
+        self._latest = np.zeros((n_trees, self.n_nodes), dtype=np.float64)
+        self._window = np.zeros((window_size, N_FEATURES), dtype=np.float64)
+        self._filled = 0
+        self._lock = threading.Lock()
+
+        # Read without the lock; replaced as a whole on every refresh
+        self._snapshot = None   # (reference mass, score threshold, window id)
+
+        self.observed = 0
+        self.refreshes = 0
+        self.last_drift: Optional[float] = None
+        self.drift_history = []
+        self.last_refresh_seconds: Optional[float] = None
+        self.last_refresh_at: Optional[float] = None
+        self.window_seconds: Optional[float] = None
+        self._window_started = time.time()
+
+    def _build_trees(self, rng) -> None:
+        """Random split dimension per node, splitting each region at its midpoint."""
+        self.n_nodes = 2 ** (self.depth + 1) - 1
+        self.split_dim = np.zeros((self.n_trees, self.n_nodes), dtype=np.intp)
+        self.split_value = np.zeros((self.n_trees, self.n_nodes), dtype=np.float64)
+
+        for tree in range(self.n_trees):
+            # Randomly shifted workspace that still covers the unit cube
+            s = rng.uniform(0.0, 1.0, N_FEATURES)
+            sigma = 2.0 * np.maximum(s, 1.0 - s)
+            low = np.empty((self.n_nodes, N_FEATURES))
+            high = np.empty((self.n_nodes, N_FEATURES))
+            low[0], high[0] = s - sigma, s + sigma
+
+            for node in range(2 ** self.depth - 1):
+                dim = rng.integers(N_FEATURES)
+                mid = (low[node, dim] + high[node, dim]) / 2
+                self.split_dim[tree, node] = dim
+                self.split_value[tree, node] = mid
+                left, right = 2 * node + 1, 2 * node + 2
+                low[left], high[left] = low[node], high[node]
+                low[right], high[right] = low[node], high[node]
+                high[left, dim] = mid
+                low[right, dim] = mid
+
+    def _paths(self, x: np.ndarray) -> np.ndarray:
+        """Node index at every level of every tree, shape (depth + 1, n_trees)."""
+        paths = np.empty((self.depth + 1, self.n_trees), dtype=np.intp)
+        node = np.zeros(self.n_trees, dtype=np.intp)
+        paths[0] = node
+        for level in range(1, self.depth + 1):
+            go_right = x[self.split_dim[self._trees, node]] > self.split_value[self._trees, node]
+            node = 2 * node + 1 + go_right
+            paths[level] = node
+        return paths
+
+    def _score(self, x: np.ndarray, reference: np.ndarray) -> float:
+        """Sum over trees of mass x 2^level at the node where the walk stops (low = anomalous)."""
+        paths = self._paths(x)
+        mass = reference[self._trees, paths]                  # (depth + 1, n_trees)
+        stop = mass < self.size_limit
+        stop[-1] = True
+        level = np.argmax(stop, axis=0)
+        return float(np.sum(mass[level, self._trees] * 2.0 ** level))
+
+    def _score_batch(self, X: np.ndarray, reference: np.ndarray) -> np.ndarray:
+        """_score for every row of X, walking all rows down the trees together."""
+        rows = np.arange(len(X))[:, None]
+        node = np.zeros((len(X), self.n_trees), dtype=np.intp)
+        mass = np.empty((self.depth + 1, len(X), self.n_trees))
+        mass[0] = reference[self._trees, node]
+        for level in range(1, self.depth + 1):
+            go_right = X[rows, self.split_dim[self._trees, node]] > self.split_value[self._trees, node]
+            node = 2 * node + 1 + go_right
+            mass[level] = reference[self._trees, node]
+        stop = mass < self.size_limit
+        stop[-1] = True
+        level = np.argmax(stop, axis=0)                       # (n, n_trees)
+        stopped = np.take_along_axis(mass, level[None], axis=0)[0]
+        return np.sum(stopped * 2.0 ** level, axis=1)
+
+    @property
+    def window_id(self) -> int:
+        """Id of the reference window being scored against (0 until the first refresh)."""
+        snapshot = self._snapshot
+        return snapshot[2] if snapshot is not None else 0
+
+    def score(self, amount: float, frequency: float, is_international: int) -> Optional[Dict]:
+        """
+        Score a transaction against the current reference window.
+
+        Returns:
+            Flag and score, or None until the first window has been observed
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        reference, threshold, _ = snapshot
+
+        score = self._score(transaction_features(amount, frequency, is_international), reference)
+        return {
+            "anomaly_flag": -1 if score < threshold else 1,
+            "anomaly_score": round(score, 2),
+            "threshold": round(threshold, 2)
+        }
+
+    def score_batch(self, transactions: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Score an (n, 3) array of [amount, frequency, is_international]
+        against one reference window.
+
+        Returns:
+            (flags, scores), or None until the first window has been observed
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        reference, threshold, _ = snapshot
+
+        scores = self._score_batch(transaction_features_batch(transactions), reference)
+        return np.where(scores < threshold, -1, 1), scores
+
+    def learn(self, amount: float, frequency: float, is_international: int) -> None:
+        """Count one observed transaction; refresh the model when the window is full."""
+        x = transaction_features(amount, frequency, is_international)
+        with self._lock:
+            self._latest[self._trees, self._paths(x)] += 1
+            self._window[self._filled] = x
+            self._filled += 1
+            self.observed += 1
+            if self._filled == self.window_size:
+                self._refresh()
+
+    def _refresh(self) -> None:
+        start = time.perf_counter()
+        reference, self._latest = self._latest, np.zeros_like(self._latest)
+
+        scores = self._score_batch(self._window, reference)
+        threshold = float(np.quantile(scores, self.contamination))
+
+        previous = self._snapshot
+        if previous is not None:
+            level = slice(2 ** self.drift_depth - 1, 2 ** (self.drift_depth + 1) - 1)
+            old = previous[0][:, level] / self.window_size
+            new = reference[:, level] / self.window_size
+            # Total variation distance between the two windows, averaged over trees
+            self.last_drift = round(float(np.mean(0.5 * np.abs(new - old).sum(axis=1))), 4)
+            self.drift_history = (self.drift_history + [self.last_drift])[-20:]
+
+        self._snapshot = (reference, threshold, self.refreshes + 1)
+        self._filled = 0
+
+        now = time.time()
+        self.window_seconds = round(now - self._window_started, 3)
+        self._window_started = now
+        self.last_refresh_at = now
+        self.last_refresh_seconds = round(time.perf_counter() - start, 4)
+        self.refreshes += 1
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self._snapshot is not None,
+            "observed": self.observed,
+            "window_size": self.window_size,
+            "window_fill": self._filled,
+            "refreshes": self.refreshes,
+            "drift": self.last_drift,
+            "drift_history": list(self.drift_history),
+            "last_refresh_seconds": self.last_refresh_seconds,
+            "last_refresh_at": self.last_refresh_at,
+            "last_window_seconds": self.window_seconds
+        }
+
+
+# Global instance - fed by transaction event ingestion
+streaming_detector = HalfSpaceTrees()
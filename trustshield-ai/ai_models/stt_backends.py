@@ -0,0 +1,232 @@
+"""
+Pluggable speech-to-text backends.
+
+Every backend turns a file path or 16 kHz float32 waveform into a
+TranscriptionResult (text, timed segments and a confidence derived from the
+decoder's own scores). Backends are chosen by a spec string, normally from
+the environment:
+
+    TRUSTSHIELD_STT_BACKEND   whisper[:size] | int8[:size] | stub   (default: whisper)
+
+    whisper   openai-whisper in float32 (size defaults to TRUSTSHIELD_WHISPER_MODEL)
+    int8      faster-whisper with int8 weights on CPU (optional dependency)
+    stub      deterministic transcripts without model weights, for load tests
+"""
+import hashlib
+import math
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from ai_models.speech_to_text import (
+    DEFAULT_MODEL_SIZE, DEFAULT_POOL_SIZE, SAMPLE_RATE, WHISPER_MODEL_SIZES,
+    SpeechModelManager, manager
+)
+
+DEFAULT_BACKEND = os.environ.get("TRUSTSHIELD_STT_BACKEND", "whisper")
+
+
+class TranscriptionResult:
+    """Transcript with segment timings (seconds) and a 0-1 confidence."""
+
+    def __init__(self, text: str, segments: List[Dict], confidence: float):
+        self.text = text
+        self.segments = segments
+        self.confidence = confidence
+
+    def to_dict(self) -> Dict:
+        return {"text": self.text, "segments": self.segments, "confidence": self.confidence}
+
+
+def segment_confidence(segments: List[Dict]) -> float:
+    """
+    Duration-weighted mean of exp(avg_logprob) * (1 - no_speech_prob).
+
+    exp(avg_logprob) is the decoder's geometric-mean token probability, and
+    no_speech_prob discounts segments Whisper suspects are not speech.
+    """
+    weights = []
+    scores = []
+    for segment in segments:
+        weights.append(max(segment["end"] - segment["start"], 1e-3))
+        scores.append(math.exp(segment["avg_logprob"]) * (1.0 - segment["no_speech_prob"]))
+    if not weights:
+        return 0.0
+    return round(float(np.average(scores, weights=weights)), 4)
+
+
+def _result_from_segments(text: str, segments: List[Dict]) -> TranscriptionResult:
+    return TranscriptionResult(
+        text=text,
+        segments=[
+            {"start": round(s["start"], 2), "end": round(s["end"], 2), "text": s["text"].strip()}
+            for s in segments
+        ],
+        confidence=segment_confidence(segments)
+    )
+
+
+class WhisperBackend:
+    """openai-whisper served from a SpeechModelManager pool."""
+
+    def __init__(self, model_size: Optional[str] = None):
+        if model_size is None or model_size == manager.model_size:
+            self.manager = manager
+        else:
+            self.manager = SpeechModelManager(model_size, DEFAULT_POOL_SIZE)
+        self.name = f"whisper:{self.manager.model_size}"
+
+    def transcribe(self, audio) -> TranscriptionResult:
+        result = self.manager.transcribe(audio, fp16=False)
+        return _result_from_segments(result["text"], result.get("segments", []))
+
+    def warm_up(self) -> None:
+        self.manager.load()
+        # One second of silence runs the full decode path once
+        self.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, **self.manager.stats()}
+
+
+class Int8WhisperBackend:
+    """faster-whisper (CTranslate2) with int8-quantized weights on CPU."""
+
+    def __init__(self, model_size: Optional[str] = None):
+        self.model_size = model_size or DEFAULT_MODEL_SIZE
+        if self.model_size not in WHISPER_MODEL_SIZES:
+            raise ValueError(
+                f"Unknown Whisper model size '{self.model_size}'. Allowed: {', '.join(WHISPER_MODEL_SIZES)}"
+            )
+        self.name = f"int8:{self.model_size}"
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                from faster_whisper import WhisperModel
+                self._model = WhisperModel(
+                    self.model_size, device="cpu", compute_type="int8",
+                    num_workers=DEFAULT_POOL_SIZE
+                )
+            return self._model
+
+    def transcribe(self, audio) -> TranscriptionResult:
+        if isinstance(audio, os.PathLike):
+            audio = str(audio)
+        segments, _ = self._get_model().transcribe(audio)
+        segments = [
+            {
+                "start": s.start, "end": s.end, "text": s.text,
+                "avg_logprob": s.avg_logprob, "no_speech_prob": s.no_speech_prob
+            }
+            for s in segments
+        ]
+        return _result_from_segments("".join(s["text"] for s in segments).strip(), segments)
+
+    def warm_up(self) -> None:
+        self.transcribe(np.zeros(SAMPLE_RATE, dtype=np.float32))
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.name,
+            "model_size": self.model_size,
+            "loaded": self._model is not None
+        }
+
+
+class StubBackend:
+    """
+    Deterministic transcripts without model weights.
+    The same audio always yields the same phrase, so result caching behaves
+    as in production.
+    """
+
+    PHRASES = (
+        "Hello, this is your bank security department. We detected suspicious activity, "
+        "please verify your account number and PIN immediately.",
+        "This is the IRS. You owe back taxes and must pay today with gift cards "
+        "or a warrant will be issued for your arrest.",
+        "Hi, this is Sarah from your doctor's office confirming your appointment "
+        "next Tuesday at 2 PM.",
+        "Good morning, this is John following up on the proposal we sent last week. "
+        "Call back when you have a moment."
+    )
+    SEGMENT_SECONDS = 5.0
+
+    def __init__(self, confidence: float = 0.9):
+        self.name = "stub"
+        self.confidence = confidence
+        self.calls = 0
+
+    def transcribe(self, audio) -> TranscriptionResult:
+        self.calls += 1
+        if isinstance(audio, (str, os.PathLike)):
+            with open(audio, "rb") as f:
+                data = f.read()
+            duration = self.SEGMENT_SECONDS * 2
+        else:
+            pcm = np.ascontiguousarray(audio, dtype=np.float32)
+            data = pcm.tobytes()
+            duration = len(pcm) / SAMPLE_RATE
+
+        digest = hashlib.sha256(data).digest()
+        text = self.PHRASES[digest[0] % len(self.PHRASES)]
+        words = text.split()
+        n_segments = max(1, math.ceil(duration / self.SEGMENT_SECONDS))
+        per_segment = math.ceil(len(words) / n_segments)
+
+        segments = []
+        for i in range(n_segments):
+            chunk = words[i * per_segment:(i + 1) * per_segment]
+            if chunk:
+                segments.append({
+                    "start": round(i * duration / n_segments, 2),
+                    "end": round((i + 1) * duration / n_segments, 2),
+                    "text": " ".join(chunk)
+                })
+        return TranscriptionResult(text, segments, self.confidence)
+
+    def warm_up(self) -> None:
+        pass
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, "calls": self.calls}
+
+
+# name -> factory(size or None)
+BACKENDS: Dict[str, Callable] = {
+    "whisper": WhisperBackend,
+    "int8": Int8WhisperBackend,
+    "stub": lambda size=None: StubBackend()
+}
+
+_instances: Dict[str, object] = {}
+_instances_lock = threading.Lock()
+
+
+def register_backend(name: str, factory: Callable) -> None:
+    """Make a backend available as TRUSTSHIELD_STT_BACKEND=name[:size]."""
+    BACKENDS[name] = factory
+
+
+def get_backend(spec: Optional[str] = None):
+    """
+    Shared backend instance for a spec such as "whisper:small" or "stub".
+
+    Raises:
+        ValueError: unknown backend name
+    """
+    spec = spec or DEFAULT_BACKEND
+    with _instances_lock:
+        if spec not in _instances:
+            name, _, size = spec.partition(":")
+            if name not in BACKENDS:
+                raise ValueError(
+                    f"Unknown speech-to-text backend '{name}'. Allowed: {', '.join(BACKENDS)}"
+                )
+            _instances[spec] = BACKENDS[name](size or None)
+        return _instances[spec]
@@ -0,0 +1,166 @@
+"""
+Sliding-window transaction velocity per account.
+
+Every window (1 minute, 1 hour, 24 hours) is a ring of time buckets with a
+running count and sum. Recording an event adds it to the current bucket;
+moving forward in time subtracts the buckets that fall out of the window.
+Both are O(1) amortized - at most one pass over a window's buckets, however
+long an account was idle. Windows are exact to one bucket width.
+
+State lives in preallocated NumPy arrays with one row per account slot and
+least-recently-used eviction, like the account baselines.
+
+    TRUSTSHIELD_VELOCITY_CAPACITY   accounts kept in memory (default: 100000)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import numpy as np
+
+DEFAULT_CAPACITY = int(os.environ.get("TRUSTSHIELD_VELOCITY_CAPACITY", "100000"))
+
+# name -> (window seconds, buckets)
+WINDOWS = {
+    "1m": (60, 12),        # 5 s buckets
+    "1h": (3600, 12),      # 5 min buckets
+    "24h": (86400, 24)     # 1 h buckets
+}
+
+
+class _WindowRing:
+    """Bucket ring for one window length across all account slots."""
+
+    def __init__(self, capacity: int, window_seconds: int, n_buckets: int):
+        self.bucket_seconds = window_seconds / n_buckets
+        self.n_buckets = n_buckets
+        self.counts = np.zeros((capacity, n_buckets), dtype=np.uint32)
+        self.sums = np.zeros((capacity, n_buckets), dtype=np.float64)
+        self.total_count = np.zeros(capacity, dtype=np.int64)
+        self.total_sum = np.zeros(capacity, dtype=np.float64)
+        self.head = np.zeros(capacity, dtype=np.int64)   # newest bucket number
+
+    def reset(self, slot: int, now: float) -> None:
+        self.counts[slot] = 0
+        self.sums[slot] = 0
+        self.total_count[slot] = 0
+        self.total_sum[slot] = 0
+        self.head[slot] = int(now // self.bucket_seconds)
+
+    def advance(self, slot: int, now: float) -> None:
+        """Expire buckets that have left the window."""
+        bucket = int(now // self.bucket_seconds)
+        gap = bucket - self.head[slot]
+        if gap <= 0:
+            return
+        if gap >= self.n_buckets:
+            self.counts[slot] = 0
+            self.sums[slot] = 0
+            self.total_count[slot] = 0
+            self.total_sum[slot] = 0
+        else:
+            for step in range(1, gap + 1):
+                index = (self.head[slot] + step) % self.n_buckets
+                self.total_count[slot] -= self.counts[slot, index]
+                self.total_sum[slot] -= self.sums[slot, index]
+                self.counts[slot, index] = 0
+                self.sums[slot, index] = 0
+        self.head[slot] = bucket
+
+    def add(self, slot: int, timestamp: float, amount: float) -> None:
+        self.advance(slot, timestamp)
+        bucket = int(timestamp // self.bucket_seconds)
+        if bucket <= self.head[slot] - self.n_buckets:
+            return  # late event already outside the window
+        index = bucket % self.n_buckets
+        self.counts[slot, index] += 1
+        self.sums[slot, index] += amount
+        self.total_count[slot] += 1
+        self.total_sum[slot] += amount
+
+
+class VelocityEngine:
+    """
+    Per-account transaction counts and amount sums over sliding windows.
+
+    Args:
+        capacity: Maximum number of accounts kept; the least recently used is evicted
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.windows = {
+            name: _WindowRing(capacity, seconds, buckets)
+            for name, (seconds, buckets) in WINDOWS.items()
+        }
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free = list(range(capacity - 1, -1, -1))
+        self._lock = threading.Lock()
+        self.events = 0
+        self.evictions = 0
+
+    def _slot(self, account_id: str, create: bool, now: float) -> Optional[int]:
+        slot = self._slots.get(account_id)
+        if slot is not None:
+            self._slots.move_to_end(account_id)
+            return slot
+        if not create:
+            return None
+
+        if self._free:
+            slot = self._free.pop()
+        else:
+            _, slot = self._slots.popitem(last=False)
+            self.evictions += 1
+        for ring in self.windows.values():
+            ring.reset(slot, now)
+        self._slots[account_id] = slot
+        return slot
+
+    def record(self, account_id: str, amount: float, timestamp: Optional[float] = None) -> None:
+        """Add one transaction event."""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            slot = self._slot(account_id, create=True, now=timestamp)
+            for ring in self.windows.values():
+                ring.add(slot, timestamp, amount)
+            self.events += 1
+
+    def features(self, account_id: str, now: Optional[float] = None) -> Dict:
+        """
+        Counts and amount sums per window, e.g. {"count_1h": 2, "sum_1h": 350.0, ...}.
+        Unknown accounts have all-zero features.
+        """
+        now = time.time() if now is None else now
+        features = {}
+        with self._lock:
+            slot = self._slot(account_id, create=False, now=now)
+            for name, ring in self.windows.items():
+                if slot is None:
+                    count, total = 0, 0.0
+                else:
+                    ring.advance(slot, now)
+                    count, total = int(ring.total_count[slot]), float(ring.total_sum[slot])
+                features[f"count_{name}"] = count
+                features[f"sum_{name}"] = round(total, 2)
+        return features
+
+    def stats(self) -> Dict:
+        nbytes = sum(
+            ring.counts.nbytes + ring.sums.nbytes + ring.total_count.nbytes
+            + ring.total_sum.nbytes + ring.head.nbytes
+            for ring in self.windows.values()
+        )
+        return {
+            "accounts": len(self._slots),
+            "capacity": self.capacity,
+            "events": self.events,
+            "evictions": self.evictions,
+            "array_memory_mb": round(nbytes / (1024 * 1024), 1)
+        }
+
+
+# Global instance
+velocity = VelocityEngine()
@@ -1,32 +1,90 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import Optional, List
+from contextlib import asynccontextmanager
+import asyncio
 import random
 import os
 import shutil
 from pathlib import Path
 
+from ai_models.analysis_stages import StageTimeoutError
 from ai_models.call_analyzer import analyzer
+from ai_models.enhanced_scam_classifier import classifier
+from ai_models.online_learner import learner
+from ai_models.reputation import reputation
+from ai_models.stt_backends import get_backend as get_stt_backend
+from ai_models.streaming_anomaly import streaming_detector
+from ai_models.velocity_engine import velocity
+from backend.services.transcription_pool import (
+    QueueFullError, transcribe_audio_job, transcription_pool
+)
+from backend.services.upload_store import (
+    SHA256_PATTERN, MalformedUploadError, UploadStore, UploadTooLargeError, stream_upload_to_disk
+)
 
-app = FastAPI(title="TrustShield AI - Fraud Detection API")
+# Analyst feedback is folded into the live classifier
+classifier.attach_online_learner(learner)
 
-# Enable CORS for frontend communication
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm every model once before the server starts accepting requests."""
+    report = await asyncio.to_thread(analyzer.warm_up)
+    print(f"Models warmed up: {report}")
+    adopted = await asyncio.to_thread(upload_store.adopt_legacy_files)
+    if adopted:
+        print(f"Moved {adopted} legacy uploads into the content-addressed store")
+    await asyncio.to_thread(upload_store.gc)
+    yield
+    transcription_pool.shutdown()
+
+app = FastAPI(title="TrustShield AI - Fraud Detection API", lifespan=lifespan)
 
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Uploads are stored by content hash, with decoded audio and transcripts cached
+upload_store = UploadStore(UPLOAD_DIR.resolve())
+
 # Allowed audio file extensions
 ALLOWED_EXTENSIONS = {".mp3", ".wav", ".ogg", ".m4a", ".flac", ".aac"}
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+MULTIPART_OVERHEAD = 64 * 1024  # boundaries and part headers around the file
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """
+    Refuse uploads before the body is read when the declared size is over the
+    limit, or when no transcription slot is free.
+    """
+    if request.method == "POST" and request.url.path == "/upload-audio":
+        content_length = request.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > MAX_FILE_SIZE + MULTIPART_OVERHEAD:
+            return JSONResponse(
+                status_code=413,
+                content={"detail": f"File too large. Max size: {MAX_FILE_SIZE / (1024*1024)}MB"}
+            )
+        # Shed load before the upload is received when the pool is saturated
+        if transcription_pool.is_full():
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "Transcription queue is full, please retry later"},
+                headers={"Retry-After": str(transcription_pool.retry_after())}
+            )
+    return await call_next(request)
+
+# Enable CORS for frontend communication
+# (registered last so it also wraps early rejections like the one above)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
 
 # Request models
 class AnalyzeCallRequest(BaseModel):
@@ -38,12 +96,34 @@ class TransactionRiskRequest(BaseModel):
     amount: float = 50000
     frequency: int = 3
     is_international: int = 1
+    account_id: Optional[str] = None  # score against this account's own history
 
 class FullAnalysisRequest(BaseModel):
     audio_path: Optional[str] = None
     transcript: Optional[str] = None
     transaction_data: Optional[List[float]] = None
     demo_scenario: Optional[str] = None
+    caller_id: Optional[str] = None   # calling number, for reputation lookups
+    account_id: Optional[str] = None  # customer account, for reputation lookups
+
+class TransactionBatchRequest(BaseModel):
+    transactions: List[List[float]]  # [amount, frequency, is_international] rows
+
+class TransactionEvent(BaseModel):
+    account_id: str
+    amount: float
+    is_international: int = 0
+    timestamp: Optional[float] = None  # Unix seconds, defaults to now
+
+class TransactionEventsRequest(BaseModel):
+    events: List[TransactionEvent]
+
+class FeedbackRequest(BaseModel):
+    transcript: str
+    label: int  # 1 = confirmed scam, 0 = legitimate
+    flush: bool = False
+    caller_id: Optional[str] = None   # scam verdicts add the number to the known scam list
+    account_id: Optional[str] = None  # legitimate verdicts mark the account as verified
 
 @app.get("/")
 def root():
@@ -55,13 +135,35 @@ def root():
         "endpoints": [
             "/analyze-call",
             "/transaction-risk", 
+            "/transaction-risk/batch",
+            "/transactions/events",
+            "/transactions/velocity/{account_id}",
+            "/transactions/anomaly-model",
             "/final-risk",
             "/full-analysis",
             "/demo-scenarios",
-            "/upload-audio"
+            "/upload-audio",
+            "/feedback",
+            "/cache-stats",
+            "/reputation",
+            "/ready"
         ]
     }
 
+@app.get("/ready")
+def ready():
+    """Readiness probe - only succeeds once all models are loaded and warmed."""
+    if not analyzer.ready:
+        raise HTTPException(status_code=503, detail="Models are still warming up")
+    
+    return {
+        "status": "ready",
+        "models": analyzer.warmup_report,
+        "stages": analyzer.stage_report(),
+        "speech_model": get_stt_backend(analyzer.stt_backend).stats(),
+        "transcription_pool": transcription_pool.stats()
+    }
+
 @app.get("/demo-scenarios")
 def get_demo_scenarios():
     """Get available demo scenarios for testing."""
@@ -77,75 +179,120 @@ def get_demo_scenarios():
         }
     }
 
+def _check_audio_filename(filename: str) -> None:
+    """Reject unsupported file types before any file data is written."""
+    if Path(filename).suffix.lower() not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+        )
+
 @app.post("/upload-audio")
-async def upload_audio(file: UploadFile = File(...)):
+async def upload_audio(request: Request, streaming: bool = False):
     """
-    Upload and analyze audio file.
+    Upload and analyze audio file (multipart form field "file").
     Supports: mp3, wav, ogg, m4a, flac, aac
     Max size: 50MB
+    With ?streaming=true, long calls stop transcribing once fraud is certain.
     """
     try:
-        # Validate file extension
-        file_ext = Path(file.filename).suffix.lower()
-        if file_ext not in ALLOWED_EXTENSIONS:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid file type. Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+        # The body is parsed as it arrives and the file written to disk once,
+        # enforcing the size limit as bytes arrive
+        try:
+            upload, filename = await stream_upload_to_disk(
+                request, UPLOAD_DIR, MAX_FILE_SIZE, MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+                check_filename=_check_audio_filename
             )
-        
-        # Read file content
-        contents = await file.read()
-        file_size = len(contents)
-        
-        # Validate file size
-        if file_size > MAX_FILE_SIZE:
+        except UploadTooLargeError:
             raise HTTPException(
-                status_code=400,
+                status_code=413,
                 detail=f"File too large. Max size: {MAX_FILE_SIZE / (1024*1024)}MB"
             )
+        except MalformedUploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        file_ext = Path(filename).suffix.lower()
+        file_size = upload.size
         
         if file_size == 0:
+            upload.discard()
             raise HTTPException(
                 status_code=400,
                 detail="Empty file uploaded"
             )
         
-        # Generate unique filename
-        import time
-        timestamp = int(time.time())
-        safe_filename = f"{timestamp}_{file.filename}"
-        file_path = UPLOAD_DIR / safe_filename
+        # Identical content shares one blob (and its cached decode/transcript)
+        sha256 = upload.sha256
+        deduplicated = upload_store.put(upload, file_ext)
         
-        # Save file
-        with open(file_path, "wb") as f:
-            f.write(contents)
-        
-        # Analyze the audio file
         try:
-            result = analyzer.run_full_analysis(
-                audio_path=str(file_path),
-                transaction_data=None
-            )
+            # Transcripts from another STT backend or VAD setting are not reused
+            cached = upload_store.load_transcript(sha256, analyzer.transcription_settings())
+            if cached is not None:
+                # Nothing to decode or transcribe, so skip the worker pool
+                job = {
+                    "transcription": cached,
+                    "streaming": None,
+                    "audio_cache": {"transcript_cached": True, "decoded_audio_cached": False}
+                }
+            else:
+                # Transcribe in a worker process so the event loop stays free
+                job = await transcription_pool.run(
+                    transcribe_audio_job, sha256, str(upload_store.root), streaming
+                )
+            
+            # Scored here, with the live classifier (analyst feedback) and result cache
+            transcription = job["transcription"]
+            if transcription is None:
+                # Same demo fallback as analyze_audio_file
+                result = await asyncio.to_thread(analyzer.run_full_analysis)
+            else:
+                result = await asyncio.to_thread(
+                    analyzer.run_full_analysis,
+                    transcript=transcription["transcript"],
+                    audio_confidence=transcription["confidence"]
+                )
+                result["vad"] = transcription.get("vad")
+                result["segments"] = transcription.get("segments", [])
+            if job["streaming"] is not None:
+                result["streaming"] = job["streaming"]
+            result["audio_cache"] = job["audio_cache"]
             
             # Add file info to result
             result["file_info"] = {
-                "filename": file.filename,
+                "filename": filename,
                 "size": file_size,
                 "format": file_ext,
-                "saved_as": safe_filename
+                "saved_as": sha256,
+                "sha256": sha256,
+                "deduplicated": deduplicated
             }
             
+            await asyncio.to_thread(upload_store.maybe_gc)
+            
             return result
             
         except Exception as e:
-            # If analysis fails, clean up file and raise error
-            if file_path.exists():
-                file_path.unlink()
+            # If analysis fails, clean up a blob this upload created and raise error
+            if not deduplicated:
+                upload_store.delete(sha256)
+            if isinstance(e, QueueFullError):
+                raise
+            if isinstance(e, asyncio.TimeoutError):
+                raise HTTPException(
+                    status_code=504,
+                    detail=f"Audio analysis timed out after {transcription_pool.job_timeout:.0f}s"
+                )
             raise HTTPException(
                 status_code=500,
                 detail=f"Audio analysis failed: {str(e)}"
             )
     
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Transcription queue is full, please retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -156,14 +303,21 @@ async def upload_audio(file: UploadFile = File(...)):
 
 @app.delete("/upload-audio/{filename}")
 async def delete_uploaded_audio(filename: str):
-    """Delete uploaded audio file."""
+    """Delete uploaded audio file (by content hash, or a legacy file name)."""
     try:
-        file_path = UPLOAD_DIR / filename
-        if file_path.exists():
+        if SHA256_PATTERN.match(filename):
+            if upload_store.delete(filename):
+                return {"status": "deleted", "filename": filename}
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        file_path = UPLOAD_DIR / Path(filename).name
+        if file_path.is_file():
             file_path.unlink()
             return {"status": "deleted", "filename": filename}
         else:
             raise HTTPException(status_code=404, detail="File not found")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -208,7 +362,8 @@ def transaction_risk(request: TransactionRiskRequest = None):
         result = analyzer.analyze_transaction(
             request.amount,
             request.frequency,
-            request.is_international
+            request.is_international,
+            account_id=request.account_id
         )
         
         return result
@@ -216,6 +371,60 @@ def transaction_risk(request: TransactionRiskRequest = None):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transaction analysis failed: {str(e)}")
 
+@app.post("/transaction-risk/batch")
+def transaction_risk_batch(request: TransactionBatchRequest):
+    """Score many transactions in one vectorized model call."""
+    if any(len(row) != 3 for row in request.transactions):
+        raise HTTPException(
+            status_code=400,
+            detail="Each transaction must be [amount, frequency, is_international]"
+        )
+    try:
+        results = analyzer.analyze_transactions_batch(request.transactions)
+        
+        return {
+            "count": len(results),
+            "anomalous": sum(result["is_anomalous"] for result in results),
+            "results": results
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch transaction analysis failed: {str(e)}")
+
+@app.post("/transactions/events")
+def ingest_transaction_events(request: TransactionEventsRequest):
+    """Ingest completed transactions into the velocity windows and account baselines."""
+    try:
+        for event in request.events:
+            analyzer.ingest_transaction(
+                event.account_id,
+                event.amount,
+                event.is_international,
+                event.timestamp
+            )
+        
+        return {
+            "status": "accepted",
+            "ingested": len(request.events),
+            "velocity": velocity.stats()
+        }
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Event ingestion failed: {str(e)}")
+
+@app.get("/transactions/velocity/{account_id}")
+def transaction_velocity(account_id: str):
+    """Current 1m / 1h / 24h transaction counts and sums for an account."""
+    return {
+        "account_id": account_id,
+        "velocity": velocity.features(account_id)
+    }
+
+@app.get("/transactions/anomaly-model")
+def transaction_anomaly_model():
+    """Refresh timings and drift of the streaming transaction anomaly model."""
+    return streaming_detector.stats()
+
 @app.post("/final-risk")
 def final_risk():
     """
@@ -243,10 +452,11 @@ def final_risk():
         raise HTTPException(status_code=500, detail=f"Risk calculation failed: {str(e)}")
 
 @app.post("/full-analysis")
-def full_analysis(request: FullAnalysisRequest = None):
+async def full_analysis(request: FullAnalysisRequest = None):
     """
     Run complete end-to-end fraud detection pipeline.
     This is the main endpoint for comprehensive analysis.
+    Voice and transaction analysis run concurrently, each with its own timeout.
     """
     try:
         if request is None:
@@ -254,15 +464,57 @@ def full_analysis(request: FullAnalysisRequest = None):
             demo_scenario = random.choice(scenarios)
             request = FullAnalysisRequest(demo_scenario=demo_scenario)
         
-        result = analyzer.run_full_analysis(
+        result = await analyzer.run_full_analysis_async(
             audio_path=request.audio_path,
             transcript=request.transcript,
             transaction_data=request.transaction_data,
-            demo_scenario=request.demo_scenario
+            demo_scenario=request.demo_scenario,
+            caller_id=request.caller_id,
+            account_id=request.account_id
         )
         
         return result
     
+    except StageTimeoutError as e:
+        raise HTTPException(status_code=504, detail=f"Full analysis timed out: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Full analysis failed: {str(e)}")
 
+@app.post("/feedback")
+def feedback(request: FeedbackRequest):
+    """
+    Record an analyst verdict for a transcript.
+    Verdicts are folded into the live classifier in small batches.
+    """
+    try:
+        stats = learner.add_feedback(request.transcript, request.label)
+        if request.flush:
+            stats = learner.flush()
+        
+        reputation_stats = None
+        if request.caller_id or request.account_id:
+            reputation_stats = reputation.record_verdict(
+                request.label, request.caller_id, request.account_id
+            )
+        
+        return {
+            "status": "accepted",
+            "learner": stats,
+            "reputation": reputation_stats,
+            "model_version": classifier.serving_version
+        }
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Feedback failed: {str(e)}")
+
+@app.get("/cache-stats")
+def cache_stats():
+    """Hit-rate statistics for the transcript analysis cache."""
+    return analyzer.cache_stats()
+
+@app.get("/reputation")
+def reputation_stats():
+    """Size of the caller/account reputation index."""
+    return reputation.stats()
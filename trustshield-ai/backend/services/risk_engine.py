@@ -1,86 +1,186 @@
 """
 Enhanced Risk Engine with multi-factor risk assessment.
+
+The scalar functions score one call; the *_array variants score whole
+NumPy arrays of calls (bulk re-scoring, backtests) with identical results.
+
+Weights and thresholds can be replaced by a tuned config written by
+backend.services.risk_tuning (TRUSTSHIELD_RISK_CONFIG, default
+models/risk_config.json).
 """
+import json
+import os
+from bisect import bisect_right
+from pathlib import Path
+
+import numpy as np
+
+from ai_models.model_store import MODEL_DIR
+
+RISK_CONFIG_PATH = Path(os.environ.get("TRUSTSHIELD_RISK_CONFIG", MODEL_DIR / "risk_config.json"))
+
+VOICE_WEIGHT = 0.65
+TRANSACTION_WEIGHT = 0.35
+DEFAULT_CONFIDENCE = 0.85
+
+# Lower bounds of Low, Medium and Critical; scores below the first are Minimal
+RISK_THRESHOLDS = (0.25, 0.50, 0.75)
+RISK_LEVELS = ("Minimal", "Low", "Medium", "Critical")
 
-def calculate_risk(voice_prob, transaction_flag, confidence=0.85):
+# Applied in this order, then the score is clamped to [0, 1]
+BEHAVIORAL_ADJUSTMENTS = {
+    "repeat_caller": 0.1,
+    "known_scammer_pattern": 0.15,
+    "verified_customer": -0.2
+}
+
+def load_risk_config(path=RISK_CONFIG_PATH):
+    """
+    Replace the weights and thresholds with a tuned config.
+
+    Raises:
+        ValueError: the config is malformed (nothing is changed)
+    """
+    global VOICE_WEIGHT, TRANSACTION_WEIGHT, RISK_THRESHOLDS
+
+    with open(path) as f:
+        config = json.load(f)
+
+    voice_weight = float(config["voice_weight"])
+    transaction_weight = float(config["transaction_weight"])
+    thresholds = tuple(float(t) for t in config["thresholds"])
+    if len(thresholds) != len(RISK_LEVELS) - 1 or list(thresholds) != sorted(thresholds):
+        raise ValueError(f"Risk config needs {len(RISK_LEVELS) - 1} ascending thresholds")
+    if voice_weight < 0 or transaction_weight < 0:
+        raise ValueError("Risk config weights must not be negative")
+
+    VOICE_WEIGHT, TRANSACTION_WEIGHT, RISK_THRESHOLDS = voice_weight, transaction_weight, thresholds
+    return config
+
+if RISK_CONFIG_PATH.exists():
+    try:
+        load_risk_config()
+        print(f"Loaded risk config from {RISK_CONFIG_PATH}")
+    except (ValueError, KeyError) as e:
+        print(f"Ignoring invalid risk config {RISK_CONFIG_PATH}: {e}")
+
+def classify_risk_level(score):
+    """Risk level name for a score; each threshold is the inclusive lower bound of its level."""
+    return RISK_LEVELS[bisect_right(RISK_THRESHOLDS, score)]
+
+def calculate_risk(voice_prob, transaction_flag, confidence=DEFAULT_CONFIDENCE):
     """
     Calculate final risk score using weighted multi-factor analysis.
-    
+
     Args:
         voice_prob: Fraud probability from voice analysis (0-1)
         transaction_flag: Anomaly flag from transaction analysis (-1 or 1)
         confidence: Confidence level of voice analysis (0-1)
-    
+
     Returns:
         (final_score, risk_level)
     """
     # Transaction risk score
     transaction_score = 1.0 if transaction_flag == -1 else 0.0
-    
+
     # Apply confidence weighting to voice probability
     weighted_voice = voice_prob * confidence
-    
+
     # Weighted combination (voice is primary indicator)
-    final_score = (weighted_voice * 0.65) + (transaction_score * 0.35)
-    
-    # Risk level classification with refined thresholds
-    if final_score >= 0.75:
-        level = "Critical"
-    elif final_score >= 0.50:
-        level = "Medium"
-    elif final_score >= 0.25:
-        level = "Low"
-    else:
-        level = "Minimal"
-    
-    return final_score, level
+    final_score = (weighted_voice * VOICE_WEIGHT) + (transaction_score * TRANSACTION_WEIGHT)
+
+    return final_score, classify_risk_level(final_score)
 
 def calculate_detailed_risk(voice_analysis, transaction_analysis, behavioral_factors=None):
     """
     Advanced risk calculation with multiple data sources.
-    
+
     Args:
         voice_analysis: Dict with fraud_probability, confidence, risk_factors
         transaction_analysis: Dict with anomaly_flag, risk_indicators
         behavioral_factors: Optional dict with additional behavioral signals
-    
+
     Returns:
         Dict with detailed risk assessment
     """
     voice_prob = voice_analysis.get("fraud_probability", 0)
-    voice_confidence = voice_analysis.get("confidence", 0.85)
+    voice_confidence = voice_analysis.get("confidence", DEFAULT_CONFIDENCE)
     transaction_flag = transaction_analysis.get("anomaly_flag", 1)
-    
+
     # Base risk calculation
     base_score, base_level = calculate_risk(voice_prob, transaction_flag, voice_confidence)
-    
+
     # Apply behavioral adjustments if available
     behavioral_adjustment = 0
     if behavioral_factors:
-        if behavioral_factors.get("repeat_caller", False):
-            behavioral_adjustment += 0.1
-        if behavioral_factors.get("known_scammer_pattern", False):
-            behavioral_adjustment += 0.15
-        if behavioral_factors.get("verified_customer", False):
-            behavioral_adjustment -= 0.2
-    
+        for factor, adjustment in BEHAVIORAL_ADJUSTMENTS.items():
+            if behavioral_factors.get(factor, False):
+                behavioral_adjustment += adjustment
+
     # Final adjusted score
     adjusted_score = min(1.0, max(0.0, base_score + behavioral_adjustment))
-    
-    # Recalculate level with adjusted score
-    if adjusted_score >= 0.75:
-        final_level = "Critical"
-    elif adjusted_score >= 0.50:
-        final_level = "Medium"
-    elif adjusted_score >= 0.25:
-        final_level = "Low"
-    else:
-        final_level = "Minimal"
-    
+
     return {
         "risk_score": adjusted_score,
-        "risk_level": final_level,
+        "risk_level": classify_risk_level(adjusted_score),
         "base_score": base_score,
         "behavioral_adjustment": behavioral_adjustment,
         "confidence": voice_confidence
-    }
\ No newline at end of file
+    }
+
+def classify_risk_levels(scores):
+    """Vectorized classify_risk_level; returns an array of level names."""
+    return np.asarray(RISK_LEVELS)[np.digitize(scores, RISK_THRESHOLDS)]
+
+def calculate_risk_array(voice_prob, transaction_flag, confidence=DEFAULT_CONFIDENCE):
+    """
+    calculate_risk over arrays of calls.
+
+    Args:
+        voice_prob: Array of voice fraud probabilities
+        transaction_flag: Array of anomaly flags (-1 or 1)
+        confidence: Array (or scalar) of voice confidences
+
+    Returns:
+        (scores, levels) arrays
+    """
+    voice_prob = np.asarray(voice_prob, dtype=np.float64)
+    transaction_score = np.where(np.asarray(transaction_flag) == -1, 1.0, 0.0)
+
+    # Same operation order as calculate_risk, so results are bit-identical
+    weighted_voice = voice_prob * np.asarray(confidence, dtype=np.float64)
+    scores = (weighted_voice * VOICE_WEIGHT) + (transaction_score * TRANSACTION_WEIGHT)
+
+    return scores, classify_risk_levels(scores)
+
+def calculate_detailed_risk_array(voice_prob, confidence, transaction_flag, behavioral_factors=None):
+    """
+    calculate_detailed_risk over arrays of calls.
+
+    Args:
+        voice_prob: Array of voice fraud probabilities
+        confidence: Array of voice confidences
+        transaction_flag: Array of anomaly flags (-1 or 1)
+        behavioral_factors: Optional dict of boolean arrays keyed like
+            BEHAVIORAL_ADJUSTMENTS (missing keys count as False)
+
+    Returns:
+        Dict of arrays with the same keys as calculate_detailed_risk
+    """
+    base_scores, _ = calculate_risk_array(voice_prob, transaction_flag, confidence)
+
+    behavioral_adjustment = np.zeros_like(base_scores)
+    for factor, adjustment in BEHAVIORAL_ADJUSTMENTS.items():
+        if behavioral_factors and factor in behavioral_factors:
+            flags = np.asarray(behavioral_factors[factor], dtype=bool)
+            behavioral_adjustment = behavioral_adjustment + np.where(flags, adjustment, 0.0)
+
+    adjusted_scores = np.minimum(1.0, np.maximum(0.0, base_scores + behavioral_adjustment))
+
+    return {
+        "risk_score": adjusted_scores,
+        "risk_level": classify_risk_levels(adjusted_scores),
+        "base_score": base_scores,
+        "behavioral_adjustment": behavioral_adjustment,
+        "confidence": np.broadcast_to(np.asarray(confidence, dtype=np.float64), base_scores.shape)
+    }
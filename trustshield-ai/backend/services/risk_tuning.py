@@ -0,0 +1,193 @@
+"""
+Offline sweep of risk-engine weights and thresholds against labelled calls.
+
+Every (voice weight, threshold) pair on a grid is evaluated without
+re-sorting: calls are sorted once, the risk scores for each weight come out
+already sorted, and one searchsorted per weight counts the calls at or above
+every threshold. The result is precision, recall and alert-volume surfaces over
+the grid, and a recommended configuration the risk engine loads at startup.
+
+Input CSV columns: voice_prob, transaction_flag (-1/1), label (1 = fraud),
+and optionally confidence (default 0.85).
+
+Usage (from the trustshield-ai directory):
+    python -m backend.services.risk_tuning labelled_calls.csv [config.json]
+"""
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+from backend.services.risk_engine import DEFAULT_CONFIDENCE, RISK_CONFIG_PATH, RISK_LEVELS
+
+WEIGHT_GRID = np.round(np.linspace(0.0, 1.0, 101), 2)
+THRESHOLD_GRID = np.round(np.linspace(0.0, 1.0, 201), 3)
+
+# Recommendation targets
+CRITICAL_PRECISION = 0.95
+MEDIUM_RECALL = 0.90
+LOW_RECALL = 0.98
+
+
+def sweep(voice_prob, confidence, transaction_flag, labels,
+          weights=WEIGHT_GRID, thresholds=THRESHOLD_GRID) -> Dict:
+    """
+    Evaluate every voice weight against every alert threshold.
+    The transaction weight is 1 - voice weight, as in the default engine.
+
+    Returns:
+        Dict with the grids and (weights x thresholds) arrays precision,
+        recall and alert_rate for "alert if score >= threshold"
+    """
+    voice_prob = np.asarray(voice_prob, dtype=np.float64)
+    labels = np.asarray(labels, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    n_calls = len(labels)
+    positives = int(labels.sum())
+
+    # Same operation order as calculate_risk
+    weighted_voice = voice_prob * np.asarray(confidence, dtype=np.float64)
+    transaction_score = np.where(np.asarray(transaction_flag) == -1, 1.0, 0.0)
+
+    true_positives = np.zeros((len(weights), len(thresholds)), dtype=np.int64)
+    alerts = np.zeros_like(true_positives)
+
+    # Within calls sharing a transaction score, the risk score is monotone in
+    # weighted_voice for every weight (rounding is monotone too), so one sort
+    # per group replaces a sort per weight.
+    for flagged in (0.0, 1.0):
+        group = transaction_score == flagged
+        order = np.argsort(weighted_voice[group], kind="stable")
+        group_voice = weighted_voice[group][order]
+        group_score = transaction_score[group][order]
+        group_size = len(group_voice)
+        # Fraud cases strictly below each sorted position
+        positives_below = np.concatenate(([0], np.cumsum(labels[group][order])))
+
+        for row, w in enumerate(weights):
+            # Already sorted
+            scores = (group_voice * w) + (group_score * (1.0 - w))
+
+            # Count of scores < threshold, for every threshold
+            below = np.searchsorted(scores, thresholds, side="left")
+
+            alerts[row] += group_size - below
+            true_positives[row] += positives_below[-1] - positives_below[below]
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(alerts > 0, true_positives / alerts, np.nan)
+        recall = true_positives / positives if positives else np.zeros(alerts.shape)
+
+    return {
+        "weights": weights,
+        "thresholds": thresholds,
+        "precision": precision,
+        "recall": recall,
+        "alert_rate": alerts / max(n_calls, 1),
+        "calls": n_calls,
+        "fraud_cases": positives
+    }
+
+
+def _largest_threshold_with_recall(recall_row, thresholds, target) -> float:
+    # Recall only falls as the threshold rises
+    ok = np.flatnonzero(recall_row >= target)
+    return float(thresholds[ok[-1]]) if len(ok) else float(thresholds[0])
+
+
+def recommend(surfaces: Dict,
+              critical_precision: float = CRITICAL_PRECISION,
+              medium_recall: float = MEDIUM_RECALL,
+              low_recall: float = LOW_RECALL) -> Dict:
+    """
+    Choose weights and thresholds from the surfaces.
+
+    Critical is the lowest threshold whose precision reaches
+    critical_precision, at the weight where that catches the most fraud (if
+    no setting reaches it, the best-F1 setting is used). Medium and Low are
+    the highest thresholds that keep recall at medium_recall and low_recall.
+
+    Returns:
+        Risk engine config dict
+    """
+    weights, thresholds = surfaces["weights"], surfaces["thresholds"]
+    precision, recall = surfaces["precision"], surfaces["recall"]
+
+    meets = np.nan_to_num(precision, nan=0.0) >= critical_precision
+    if meets.any():
+        # Best recall among settings that meet the precision target
+        candidate_recall = np.where(meets, recall, -1.0)
+        w, t = np.unravel_index(np.argmax(candidate_recall), candidate_recall.shape)
+    else:
+        with np.errstate(invalid="ignore"):
+            f1 = np.nan_to_num(2 * precision * recall / (precision + recall), nan=0.0)
+        w, t = np.unravel_index(np.argmax(f1), f1.shape)
+
+    critical = float(thresholds[t])
+    medium = min(_largest_threshold_with_recall(recall[w], thresholds, medium_recall), critical)
+    low = min(_largest_threshold_with_recall(recall[w], thresholds, low_recall), medium)
+
+    metrics = {}
+    for level, threshold in zip(RISK_LEVELS[1:], (low, medium, critical)):
+        index = int(np.searchsorted(thresholds, threshold))
+        metrics[level] = {
+            "threshold": threshold,
+            "precision": None if np.isnan(precision[w, index]) else round(float(precision[w, index]), 4),
+            "recall": round(float(recall[w, index]), 4),
+            "alert_rate": round(float(surfaces["alert_rate"][w, index]), 4)
+        }
+
+    return {
+        "voice_weight": float(weights[w]),
+        "transaction_weight": 1.0 - float(weights[w]),
+        "thresholds": [low, medium, critical],
+        "metrics": metrics,
+        "targets": {
+            "critical_precision": critical_precision,
+            "medium_recall": medium_recall,
+            "low_recall": low_recall
+        },
+        "calls": surfaces["calls"],
+        "fraud_cases": surfaces["fraud_cases"],
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z")
+    }
+
+
+def run(csv_path, config_path=RISK_CONFIG_PATH) -> Dict:
+    """Sweep a labelled CSV, write the surfaces and the recommended config."""
+    import pandas as pd
+
+    data = pd.read_csv(csv_path)
+    confidence = data["confidence"] if "confidence" in data else DEFAULT_CONFIDENCE
+
+    start = time.perf_counter()
+    surfaces = sweep(data["voice_prob"], confidence, data["transaction_flag"], data["label"])
+    seconds = time.perf_counter() - start
+
+    config = recommend(surfaces)
+    config_path = Path(config_path)
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(config_path, "w") as f:
+        json.dump(config, f, indent=2)
+
+    np.savez(
+        config_path.with_name(config_path.stem + "_surfaces.npz"),
+        **{key: value for key, value in surfaces.items() if isinstance(value, np.ndarray)}
+    )
+
+    combinations = len(surfaces["weights"]) * len(surfaces["thresholds"])
+    print(f"Evaluated {combinations} combinations over {surfaces['calls']} calls in {seconds:.2f}s")
+    return config
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m backend.services.risk_tuning labelled_calls.csv [config.json]")
+        sys.exit(1)
+
+    recommended = run(*sys.argv[1:3])
+    print(json.dumps(recommended, indent=2))
@@ -0,0 +1,220 @@
+"""
+Process pool for CPU-bound audio analysis with a bounded job queue.
+
+Whisper transcription takes seconds of pure CPU, so it runs in dedicated
+worker processes instead of on the event loop. At most `workers + max_queue`
+jobs are admitted at once; beyond that callers get QueueFullError and the API
+answers 503 with a Retry-After estimate.
+"""
+import asyncio
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+DEFAULT_WORKERS = int(os.environ.get("TRUSTSHIELD_TRANSCRIPTION_WORKERS", "2"))
+DEFAULT_MAX_QUEUE = int(os.environ.get("TRUSTSHIELD_TRANSCRIPTION_QUEUE", "8"))
+DEFAULT_JOB_TIMEOUT = float(os.environ.get("TRUSTSHIELD_TRANSCRIPTION_TIMEOUT", "300"))
+
+
+class QueueFullError(Exception):
+    """Raised when no job slot is free; carries a Retry-After hint in seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Transcription queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _init_worker(workers: int):
+    # Long recordings are split across a chunk pool inside each worker; the
+    # workers split the cores between them rather than each taking them all
+    from ai_models.speech_to_text import share_cpus
+    share_cpus(workers)
+
+    # Streaming jobs score as they transcribe, with the same analyst-feedback
+    # blend as the API process (reloaded from its snapshot before each job)
+    from ai_models.enhanced_scam_classifier import classifier
+    from ai_models.online_learner import learner
+    classifier.attach_online_learner(learner)
+
+    # Each worker loads and warms its own models once, not per job
+    from ai_models.call_analyzer import analyzer
+    analyzer.warm_up()
+
+
+def transcribe_audio_job(sha256: str, upload_root: str, streaming: bool = False) -> Dict:
+    """
+    Transcription for one stored upload; runs inside a worker process.
+    Reuses the cached decoded audio, else decodes. Scoring happens in the API
+    process (see CallAnalyzer.run_full_analysis), so every score uses the
+    live classifier and result cache.
+
+    With streaming, transcription stops as soon as the transcript so far is
+    clearly a scam; only a complete transcript is cached.
+
+    Returns:
+        "transcription" (transcript, confidence, segments, vad; None if
+        transcription failed), "streaming" (progress section, or None) and
+        "audio_cache"
+    """
+    from ai_models.call_analyzer import analyzer
+    from ai_models.online_learner import learner
+    from ai_models.speech_to_text import load_audio
+    from backend.services.upload_store import UploadStore
+
+    store = UploadStore(upload_root)
+    cache_info = {"transcript_cached": False, "decoded_audio_cached": False}
+    job = {"transcription": None, "streaming": None, "audio_cache": cache_info}
+
+    try:
+        pcm = store.load_pcm(sha256)
+        if pcm is not None:
+            cache_info["decoded_audio_cached"] = True
+        else:
+            pcm = load_audio(store.audio_path(sha256))
+            store.save_pcm(sha256, pcm)
+
+        if streaming:
+            learner.refresh()
+            streamed = analyzer.analyze_audio_streaming(pcm)
+            job["streaming"] = streamed["streaming"]
+            job["transcription"] = {
+                "transcript": streamed["transcript"],
+                "confidence": streamed["confidence"],
+                "segments": [],
+                "vad": streamed["vad"]
+            }
+            if not streamed["streaming"]["early_stopped"]:
+                store.save_transcript(sha256, job["transcription"], analyzer.transcription_settings())
+        else:
+            job["transcription"] = analyzer.transcribe_detailed(pcm)
+            store.save_transcript(sha256, job["transcription"], analyzer.transcription_settings())
+    except Exception as e:
+        # The caller falls back to the demo analysis; nothing is cached
+        print(f"Audio transcription failed: {e}")
+    return job
+
+
+class TranscriptionPool:
+    def __init__(self,
+                 workers: int = DEFAULT_WORKERS,
+                 max_queue: int = DEFAULT_MAX_QUEUE,
+                 job_timeout: float = DEFAULT_JOB_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self.capacity = workers + max_queue
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._active = 0
+        self._avg_job_seconds = 30.0
+
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.restarts = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a process that already holds torch/BLAS threads is unsafe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.workers,)
+                )
+            return self._executor
+
+    def _replace_broken(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a pool whose worker died (OOM kill, segfault); the next job starts a new one."""
+        with self._lock:
+            if self._executor is not executor:
+                return  # another job already replaced it
+            self._executor = None
+            self.restarts += 1
+        print("Transcription worker died; restarting the process pool")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def is_full(self) -> bool:
+        return self._active >= self.capacity
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up."""
+        waves = max(1, math.ceil((self._active - self.workers + 1) / self.workers))
+        return max(1, math.ceil(self._avg_job_seconds * waves))
+
+    def _release(self, started: float) -> None:
+        with self._lock:
+            self._active -= 1
+            self.completed += 1
+            self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * (time.monotonic() - started)
+
+    async def run(self, func, *args):
+        """
+        Run func(*args) in a worker process.
+
+        Raises:
+            QueueFullError: no job slot is free
+            asyncio.TimeoutError: the job exceeded job_timeout
+        """
+        with self._lock:
+            if self._active >= self.capacity:
+                self.rejected += 1
+                raise QueueFullError(self.retry_after())
+            self._active += 1
+
+        started = time.monotonic()
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(func, *args)
+            except BrokenProcessPool:
+                self._replace_broken(executor)
+                executor = self._get_executor()
+                future = executor.submit(func, *args)
+        except Exception:
+            with self._lock:
+                self._active -= 1
+            raise
+        # The slot is held until the worker actually finishes, even after a timeout
+        future.add_done_callback(lambda _: self._release(started))
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.job_timeout)
+        except asyncio.TimeoutError:
+            # Queued jobs are cancelled; a job already running finishes in its worker
+            future.cancel()
+            self.timed_out += 1
+            raise
+        except BrokenProcessPool:
+            # This job is lost, but later jobs get a fresh pool
+            self._replace_broken(executor)
+            raise
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "active_jobs": self._active,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "restarts": self.restarts,
+            "avg_job_seconds": round(self._avg_job_seconds, 2)
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Global instance - worker processes start with the first job
+transcription_pool = TranscriptionPool()
@@ -0,0 +1,336 @@
+"""
+Streaming, content-addressed persistence for uploaded audio.
+
+The multipart request body is parsed as it arrives and the file part is
+written straight to a temporary file, so per-request memory stays constant
+regardless of file size and the file is written to disk once. The size limit
+is enforced as bytes arrive (also for chunked uploads without a
+Content-Length) and the SHA-256 is computed on the fly; the file only appears
+under its final name via an atomic rename once it is complete.
+
+Completed uploads are stored by content hash, so identical files share one
+blob, and the decoded 16 kHz PCM and transcript are cached beside it:
+
+    uploads/blobs/ab/ab12...ef/
+        audio.mp3          <- original upload
+        pcm.npy            <- decoded 16 kHz mono float32
+        transcript.json    <- transcript and confidence, tagged with the
+                              settings that produced it (STT backend, VAD)
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+DEFAULT_MAX_BYTES = int(float(os.environ.get("TRUSTSHIELD_UPLOAD_MAX_GB", "5")) * 1024 ** 3)
+DEFAULT_MAX_AGE = float(os.environ.get("TRUSTSHIELD_UPLOAD_MAX_AGE_DAYS", "30")) * 86400
+GC_INTERVAL = 600.0  # seconds between automatic collections
+
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadTooLargeError(Exception):
+    """Raised as soon as an upload exceeds the size limit."""
+
+
+class MalformedUploadError(Exception):
+    """Raised when the request is not a multipart upload with the expected file field."""
+
+
+class StreamedUpload:
+    """A fully received upload waiting in a temporary file."""
+
+    def __init__(self, temp_path: Path, size: int, sha256: str):
+        self.temp_path = temp_path
+        self.size = size
+        self.sha256 = sha256
+
+    def commit(self, destination: Path) -> Path:
+        """Atomically move the upload to its final name."""
+        os.replace(self.temp_path, destination)
+        return destination
+
+    def discard(self) -> None:
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+async def stream_upload_to_disk(request, directory: Path, max_size: int, max_body: int,
+                                field_name: str = "file",
+                                check_filename: Optional[Callable[[str], None]] = None
+                                ) -> Tuple[StreamedUpload, str]:
+    """
+    Parse a multipart/form-data request body as it arrives and copy the
+    file field into a temporary file inside directory.
+
+    The temporary file lives in the destination directory so the final
+    rename never crosses filesystems.
+
+    Args:
+        request: Starlette request whose body has not been read
+        max_size: Largest accepted file
+        max_body: Largest accepted request body (file plus multipart framing)
+        field_name: Form field carrying the file
+        check_filename: Called with the client filename before any file data
+            is written; may raise to reject the upload
+
+    Returns:
+        (upload, client filename)
+
+    Raises:
+        UploadTooLargeError: the file or body exceeded its limit (nothing is kept)
+        MalformedUploadError: not multipart, or no file in field_name
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise MalformedUploadError("Expected a multipart/form-data upload")
+
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    out = os.fdopen(fd, "wb")
+
+    headers = {}
+    header_field = bytearray()
+    header_value = bytearray()
+    part = {"is_file": False}
+    state = {"size": 0, "filename": None}
+
+    def on_part_begin():
+        headers.clear()
+
+    def on_header_field(data, start, end):
+        header_field.extend(data[start:end])
+
+    def on_header_value(data, start, end):
+        header_value.extend(data[start:end])
+
+    def on_header_end():
+        headers[bytes(header_field).lower()] = bytes(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        part["is_file"] = (
+            state["filename"] is None
+            and options.get(b"name") == field_name.encode()
+            and b"filename" in options
+        )
+        if part["is_file"]:
+            state["filename"] = options[b"filename"].decode("utf-8", "replace")
+            if check_filename is not None:
+                check_filename(state["filename"])
+
+    def on_part_data(data, start, end):
+        if not part["is_file"]:
+            return
+        chunk = data[start:end]
+        state["size"] += len(chunk)
+        if state["size"] > max_size:
+            raise UploadTooLargeError(f"Upload exceeds {max_size} bytes")
+        digest.update(chunk)
+        out.write(chunk)
+
+    def on_part_end():
+        part["is_file"] = False
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end
+    })
+
+    try:
+        with out:
+            received = 0
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_body:
+                    raise UploadTooLargeError(f"Request body exceeds {max_body} bytes")
+                parser.write(chunk)
+            parser.finalize()
+        if state["filename"] is None:
+            raise MalformedUploadError(f"No file in form field '{field_name}'")
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+    return StreamedUpload(Path(temp_path), state["size"], digest.hexdigest()), state["filename"]
+
+
+class UploadStore:
+    """Content-addressed blob store with cached decodes and size/age-bounded retention."""
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age: float = DEFAULT_MAX_AGE):
+        self.root = Path(root)
+        self.blob_root = self.root / "blobs"
+        self.blob_root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._gc_lock = threading.Lock()
+        self._last_gc = 0.0
+
+    def blob_dir(self, sha256: str) -> Path:
+        if not SHA256_PATTERN.match(sha256):
+            raise ValueError("Not a SHA-256 content hash")
+        return self.blob_root / sha256[:2] / sha256
+
+    def audio_path(self, sha256: str) -> Optional[Path]:
+        directory = self.blob_dir(sha256)
+        matches = sorted(directory.glob("audio*")) if directory.is_dir() else []
+        return matches[0] if matches else None
+
+    def put(self, upload: StreamedUpload, extension: str) -> bool:
+        """
+        Store a streamed upload under its content hash.
+        Returns True if an identical blob already existed (the upload is discarded).
+        """
+        directory = self.blob_dir(upload.sha256)
+        if self.audio_path(upload.sha256) is not None:
+            upload.discard()
+            self.touch(upload.sha256)
+            return True
+
+        directory.mkdir(parents=True, exist_ok=True)
+        upload.commit(directory / f"audio{extension}")
+        return False
+
+    def touch(self, sha256: str) -> None:
+        """Mark a blob as recently used so retention keeps it."""
+        try:
+            os.utime(self.blob_dir(sha256))
+        except FileNotFoundError:
+            pass
+
+    def _write_atomic(self, path: Path, write) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def load_pcm(self, sha256: str) -> Optional[np.ndarray]:
+        try:
+            return np.load(self.blob_dir(sha256) / "pcm.npy")
+        except FileNotFoundError:
+            return None
+
+    def save_pcm(self, sha256: str, pcm: np.ndarray) -> None:
+        self._write_atomic(
+            self.blob_dir(sha256) / "pcm.npy",
+            lambda f: np.save(f, np.asarray(pcm, dtype=np.float32))
+        )
+
+    def load_transcript(self, sha256: str, producer: Dict) -> Optional[Dict]:
+        """
+        Cached transcript, or None if there is none or it was produced with
+        different settings (e.g. another STT backend or model size).
+        """
+        try:
+            with open(self.blob_dir(sha256) / "transcript.json") as f:
+                cached = json.load(f)
+        except FileNotFoundError:
+            return None
+        if cached.pop("producer", None) != producer:
+            return None
+        return cached
+
+    def save_transcript(self, sha256: str, transcript: Dict, producer: Dict) -> None:
+        """Cache a transcript with the settings that produced it (JSON-serialisable)."""
+        self._write_atomic(
+            self.blob_dir(sha256) / "transcript.json",
+            lambda f: f.write(json.dumps(dict(transcript, producer=producer)).encode("utf-8"))
+        )
+
+    def delete(self, sha256: str) -> bool:
+        directory = self.blob_dir(sha256)
+        if not directory.is_dir():
+            return False
+        shutil.rmtree(directory)
+        self._remove_empty_shard(directory.parent)
+        return True
+
+    def _remove_empty_shard(self, shard: Path) -> None:
+        try:
+            shard.rmdir()
+        except OSError:
+            pass
+
+    def adopt_legacy_files(self) -> int:
+        """Move flat '{timestamp}_{filename}' uploads into the blob store, deduplicating."""
+        adopted = 0
+        for path in self.root.iterdir():
+            if not path.is_file() or path.name.startswith("."):
+                continue
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+            self.put(StreamedUpload(path, path.stat().st_size, digest.hexdigest()), path.suffix.lower())
+            adopted += 1
+        return adopted
+
+    def gc(self) -> Dict:
+        """
+        Delete blobs unused for longer than max_age, then the least recently
+        used ones until the store fits in max_bytes.
+        """
+        with self._gc_lock:
+            now = time.time()
+            blobs = []
+            for directory in self.blob_root.glob("*/*"):
+                if not directory.is_dir():
+                    continue
+                size = sum(f.stat().st_size for f in directory.iterdir() if f.is_file())
+                blobs.append((directory.stat().st_mtime, size, directory))
+            blobs.sort()
+
+            total = sum(size for _, size, _ in blobs)
+            removed = 0
+            freed = 0
+            for last_used, size, directory in blobs:
+                if now - last_used <= self.max_age and total <= self.max_bytes:
+                    break
+                shutil.rmtree(directory, ignore_errors=True)
+                self._remove_empty_shard(directory.parent)
+                total -= size
+                freed += size
+                removed += 1
+
+            self._last_gc = now
+            return {
+                "blobs": len(blobs) - removed,
+                "bytes": total,
+                "removed": removed,
+                "freed_bytes": freed
+            }
+
+    def maybe_gc(self) -> Optional[Dict]:
+        """Run gc() if the last collection is older than GC_INTERVAL."""
+        if time.time() - self._last_gc < GC_INTERVAL:
+            return None
+        return self.gc()